@@ -0,0 +1,276 @@
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+# -----------------------------
+# Bulk color-buffer I/O
+# -----------------------------
+# Every color layer (mesh.color_attributes entries and legacy
+# mesh.vertex_colors layers) exposes a ``data`` collection whose items carry
+# a 4-float ``color``.  Reading or writing those one item at a time costs one
+# RNA access per element, so all operators go through the helpers below,
+# which move a whole layer with a single foreach_get / foreach_set.
+
+
+def layer_domain(layer):
+    """Return 'POINT' or 'CORNER' for a color attribute or legacy layer."""
+    # Legacy vertex_colors layers have no domain and always live on corners
+    return getattr(layer, "domain", 'CORNER')
+
+
+def is_byte_layer(layer):
+    """True when the layer stores 8-bit colors (BYTE_COLOR or legacy layer)."""
+    return getattr(layer, "data_type", 'BYTE_COLOR') == 'BYTE_COLOR'
+
+
+def read_colors(layer):
+    """Fetch every color of a layer as a contiguous (N, 4) float32 array."""
+    count = len(layer.data)
+    buf = np.empty(count * 4, dtype=np.float32)
+    layer.data.foreach_get("color", buf)
+    return buf.reshape(count, 4)
+
+
+def write_colors(layer, colors):
+    """Write an (N, 4) array back to a layer with one foreach_set."""
+    buf = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1)
+    layer.data.foreach_set("color", buf)
+
+
+def loop_vertex_indices(mesh):
+    """Return the vertex index of every loop as an int32 array."""
+    idx = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", idx)
+    return idx
+
+
+def polygon_loop_ranges(mesh):
+    """Return (loop_start, loop_total) int32 arrays for every polygon."""
+    count = len(mesh.polygons)
+    starts = np.empty(count, dtype=np.int32)
+    totals = np.empty(count, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", starts)
+    mesh.polygons.foreach_get("loop_total", totals)
+    return starts, totals
+
+
+def vertex_loop_csr(mesh):
+    """CSR map from vertices to loops as (offsets, loops) int32 arrays.
+
+    The loops of vertex ``v`` are ``loops[offsets[v]:offsets[v + 1]]``.
+    """
+    vidx = loop_vertex_indices(mesh)
+    loops = np.argsort(vidx, kind='stable').astype(np.int32)
+    offsets = np.zeros(len(mesh.vertices) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(vidx, minlength=len(mesh.vertices)), out=offsets[1:])
+    return offsets, loops
+
+
+def csr_loops(offsets, loops, vertices):
+    """Loops of ``vertices`` plus, per loop, the position of its vertex in ``vertices``."""
+    starts = offsets[vertices]
+    counts = offsets[vertices + 1] - starts
+    owner = np.repeat(np.arange(len(vertices), dtype=np.int32), counts)
+    first = np.cumsum(counts) - counts
+    pos = np.arange(len(owner), dtype=np.int64) - first[owner] + starts[owner]
+    return loops[pos], owner
+
+
+def read_corner_colors(mesh, layer):
+    """Read a layer as one color per loop, expanding POINT data to corners."""
+    colors = read_colors(layer)
+    if layer_domain(layer) == 'POINT':
+        return colors[loop_vertex_indices(mesh)]
+    return colors
+
+
+def write_corner_colors(mesh, layer, colors):
+    """Write one color per loop; POINT layers receive the per-vertex average."""
+    if layer_domain(layer) != 'POINT':
+        write_colors(layer, colors)
+        return
+    vidx = loop_vertex_indices(mesh)
+    num_verts = len(mesh.vertices)
+    counts = np.bincount(vidx, minlength=num_verts)
+    out = read_colors(layer)
+    used = counts > 0
+    for ch in range(4):
+        sums = np.bincount(vidx, weights=colors[:, ch], minlength=num_verts)
+        out[used, ch] = sums[used] / counts[used]
+    write_colors(layer, out)
+
+
+# -----------------------------
+# Compact 8-bit buffers
+# -----------------------------
+# BYTE_COLOR attributes store sRGB bytes; keeping those bytes (4 per element)
+# instead of the decoded floats (16 per element) makes snapshots 4x smaller
+# and restores bit-exact.
+SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255.0 < 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4,
+).astype(np.float32)
+
+
+def _byte_property(layer):
+    # Legacy vertex_colors layers already expose their sRGB values as 'color'
+    return "color_srgb" if hasattr(layer, "data_type") else "color"
+
+
+def read_compact_colors(layer):
+    """Read a layer as uint8 sRGB bytes when it is 8-bit, else as float32."""
+    if not is_byte_layer(layer):
+        return read_colors(layer)
+    count = len(layer.data)
+    buf = np.empty(count * 4, dtype=np.float32)
+    layer.data.foreach_get(_byte_property(layer), buf)
+    return np.rint(buf * 255.0).astype(np.uint8).reshape(count, 4)
+
+
+def write_compact_colors(layer, colors):
+    """Write an array produced by read_compact_colors back with one foreach_set."""
+    if colors.dtype != np.uint8:
+        write_colors(layer, colors)
+        return
+    buf = colors.reshape(-1).astype(np.float32) / 255.0
+    layer.data.foreach_set(_byte_property(layer), buf)
+
+
+def decode_compact_colors(colors, linear=True):
+    """Expand a compact buffer to the float values its layer reports as 'color'."""
+    if colors.dtype != np.uint8:
+        return np.array(colors, dtype=np.float32)
+    if not linear:
+        return colors.astype(np.float32) / 255.0
+    out = np.empty(colors.shape, dtype=np.float32)
+    out[:, :3] = SRGB_TO_LINEAR[colors[:, :3]]
+    out[:, 3] = colors[:, 3] / np.float32(255.0)
+    return out
+
+
+# -----------------------------
+# Budgeted snapshot store
+# -----------------------------
+class ColorBufferStore:
+    """Named color snapshots held as compact arrays under a memory budget.
+
+    Entries are kept in least-recently-used order.  When the in-memory
+    total exceeds ``budget_bytes`` the oldest entries are spilled to
+    memory-mapped temporary files and reloaded on their next use.
+    """
+
+    def __init__(self, budget_bytes=1024 * 2**20):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()   # name -> [array or memmap, linear, path]
+        self._spill_dir = None
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory; spilled entries are not counted."""
+        return sum(e[0].nbytes for e in self._entries.values() if not e[2])
+
+    def put(self, name, layer):
+        """Snapshot ``layer`` under ``name``, replacing any previous entry."""
+        self.pop(name)
+        linear = hasattr(layer, "data_type")
+        self._entries[name] = [read_compact_colors(layer), linear, None]
+        self._enforce_budget()
+
+    def count(self, name):
+        """Number of elements in a snapshot (0 when missing)."""
+        entry = self._entries.get(name)
+        return len(entry[0]) if entry else 0
+
+    def get(self, name):
+        """Return a snapshot as a float32 (N, 4) array of 'color' values."""
+        entry = self._touch(name)
+        return decode_compact_colors(entry[0], entry[1])
+
+    def restore(self, name, layer):
+        """Write a snapshot back to ``layer``; mismatched sizes restore the overlap."""
+        entry = self._touch(name)
+        data = entry[0]
+        count = len(layer.data)
+        if len(data) != count:
+            current = read_compact_colors(layer)
+            if current.dtype != data.dtype:
+                current = read_colors(layer)
+                data = decode_compact_colors(data, entry[1])
+            overlap = min(count, len(data))
+            current[:overlap] = data[:overlap]
+            data = current
+        write_compact_colors(layer, np.asarray(data))
+
+    def changed_indices(self, name, layer):
+        """Indices whose current color differs from the snapshot."""
+        data = self._touch(name)[0]
+        current = read_compact_colors(layer)
+        if current.dtype != data.dtype:
+            current = read_colors(layer)
+            data = self.get(name)
+        count = min(len(current), len(data))
+        return np.flatnonzero((current[:count] != data[:count]).any(axis=1))
+
+    def pop(self, name):
+        entry = self._entries.pop(name, None)
+        if entry and entry[2]:
+            self._remove_spill(entry)
+
+    def clear(self):
+        """Drop every entry and remove the spill directory."""
+        for name in list(self._entries):
+            self.pop(name)
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _touch(self, name):
+        entry = self._entries[name]
+        self._entries.move_to_end(name)
+        if entry[2]:
+            # Bring a spilled buffer back into memory as the newest entry
+            self._remove_spill(entry)
+            self._enforce_budget()
+        return entry
+
+    def _enforce_budget(self):
+        in_memory = [(n, e) for n, e in self._entries.items() if not e[2]]
+        total = sum(e[0].nbytes for _, e in in_memory)
+        # The most recently used entry always stays in memory
+        for _, entry in in_memory[:-1]:
+            if total <= self.budget_bytes:
+                break
+            total -= entry[0].nbytes
+            self._spill(entry)
+
+    def _spill(self, entry):
+        if self._spill_dir is None or not os.path.isdir(self._spill_dir):
+            self._spill_dir = tempfile.mkdtemp(prefix="vcol_backup_")
+        fd, path = tempfile.mkstemp(suffix=".raw", dir=self._spill_dir)
+        os.close(fd)
+        data = entry[0]
+        mapped = np.memmap(path, dtype=data.dtype, mode='w+', shape=data.shape)
+        mapped[:] = data
+        mapped.flush()
+        entry[0] = mapped
+        entry[2] = path
+
+    def _remove_spill(self, entry):
+        path = entry[2]
+        entry[2] = None
+        if isinstance(entry[0], np.memmap):
+            entry[0] = np.array(entry[0])
+        try:
+            os.remove(path)
+        except OSError:
+            pass
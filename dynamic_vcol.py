@@ -1,7 +1,10 @@
 import bpy
+import hashlib
 import mathutils
-from mathutils.kdtree import KDTree
+import numpy as np
 from math import radians
+from bpy.app.handlers import persistent
+from .buffer_vcol import read_colors, write_colors, loop_vertex_indices, vertex_loop_csr, csr_loops
 
 # Properties
 class VLPProperties(bpy.types.PropertyGroup):
@@ -93,19 +96,210 @@ class VLPProperties(bpy.types.PropertyGroup):
         default=False,
         description="Internal flag: has a save layer been created?"
     )
-    last_loc: bpy.props.FloatVectorProperty(
-        name="Last Location",
-        size=3,
-        default=(0.0, 0.0, 0.0),
-        description="Last recorded emitter location"
-    )
-    last_rot: bpy.props.FloatVectorProperty(
-        name="Last Rotation",
-        size=4,
-        default=(1.0, 0.0, 0.0, 0.0),
-        description="Last recorded emitter rotation quaternion"
+    update_mode: bpy.props.EnumProperty(
+        name="Update Mode",
+        items=[
+            ('EVENT', 'Event', 'Repaint when the emitter or a target moves, at most once per refresh interval'),
+            ('TIMER', 'Timer', 'Poll the emitter every refresh interval')
+        ],
+        default='EVENT',
+        description="How the painting session notices changes"
     )
 
+# obj.name -> local-space geometry of a painter target, reused across
+# sessions while its topology and vertex positions are unchanged
+TARGET_CACHE = {}
+
+# Object / mesh names the depsgraph reported with geometry updates
+_dirty_geometry = set()
+
+# Object / mesh names whose colors the painter wrote since the last
+# depsgraph update; the geometry update that write causes is skipped
+_painted = set()
+
+# Running painter operator and the work its depsgraph updates requested
+_session = {"op": None, "repaint": False, "verify": False}
+
+
+def track_depsgraph_updates(scene, depsgraph):
+    """depsgraph_update_post handler feeding the painting session.
+
+    Geometry updates mark targets for verification, except the first one
+    after the painter wrote a target's colors; in EVENT mode a transform
+    update of the emitter or a target requests a repaint.  Requests are
+    coalesced into one flush_paint call per refresh interval.
+    """
+    op = _session["op"]
+    watched = op.watched if op else ()
+    for update in depsgraph.updates:
+        name = update.id.original.name
+        if update.is_updated_geometry and name not in _painted:
+            _dirty_geometry.add(name)
+            if name in watched:
+                _session["verify"] = True
+        if update.is_updated_transform and name in watched:
+            _session["repaint"] = True
+    _painted.clear()
+
+    if op and op.event_mode and (_session["repaint"] or _session["verify"]):
+        if not bpy.app.timers.is_registered(flush_paint):
+            bpy.app.timers.register(flush_paint, first_interval=scene.vlp_props.refresh_rate)
+
+
+def flush_paint():
+    """Timer callback running the repaint requested since the last flush."""
+    op = _session["op"]
+    repaint, verify = _session["repaint"], _session["verify"]
+    _session["repaint"] = _session["verify"] = False
+    if op is None:
+        return None
+    context = bpy.context
+    props = context.scene.vlp_props
+    if not props.running or not props.emitter:
+        return None
+    # A geometry update can still be a color write from another tool; only
+    # a real change found by refresh_dirty_targets is worth a repaint
+    if repaint or (verify and op.refresh_dirty_targets(props)):
+        op.paint_vertices(context, props)
+    return None
+
+
+@persistent
+def clear_targets_on_load(dummy):
+    """TARGET_CACHE is keyed by object name and must not leak into another file."""
+    TARGET_CACHE.clear()
+    _dirty_geometry.clear()
+    _painted.clear()
+
+
+def tag_view3d_redraw(context):
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+
+def target_geometry(obj, cell):
+    """Return (geometry, rebuilt) for a mesh object, reusing TARGET_CACHE.
+
+    ``geometry`` holds the local-space vertex positions, the vertex->loop
+    CSR map and a VertexGrid.  It is keyed by topology counts and
+    verified with a fingerprint of the vertex coordinates and the loop
+    vertex indices (edge rotations and face flips keep the counts), so
+    moving the object never invalidates it.
+    """
+    mesh = obj.data
+    count = len(mesh.vertices)
+    co = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    key = (count, len(mesh.loops), len(mesh.polygons))
+    digest = hashlib.blake2b(co.tobytes(), digest_size=16)
+    digest.update(loop_vertex_indices(mesh).tobytes())
+    fingerprint = digest.digest()
+    cached = TARGET_CACHE.get(obj.name)
+    if cached and cached["key"] == key and cached["fingerprint"] == fingerprint:
+        return cached, False
+    local = co.reshape(count, 3)
+    cached = {
+        "key": key,
+        "fingerprint": fingerprint,
+        "local": local,
+        "loop_csr": vertex_loop_csr(mesh),
+        "grid": VertexGrid(local, cell),
+    }
+    TARGET_CACHE[obj.name] = cached
+    return cached, True
+
+
+def initial_colors(live, saved):
+    """Colors every tick starts from: the saved layer, or black."""
+    if saved and len(saved.data) == len(live.data):
+        return read_colors(saved)
+    colors = np.zeros((len(live.data), 4), dtype=np.float32)
+    colors[:, 3] = 1.0
+    return colors
+
+
+def light_factors(props, coords, emit_matrix):
+    """Return (reached, factor) arrays for world positions ``coords``.
+
+    ``reached`` marks the positions the light touches (all of them for
+    SUN, those within range otherwise); ``factor`` is the blend amount
+    toward the light color after the paint-mode modifiers.
+    """
+    mat = np.array(emit_matrix)
+    emit_loc = mat[:3, 3]
+    forward = np.array(emit_matrix.to_quaternion() @ mathutils.Vector((0, 1, 0)))
+    offset = coords - emit_loc
+    dist = np.linalg.norm(offset, axis=1)
+    # Cosine between the light direction and each vertex direction (0 at the emitter)
+    cos = (offset @ forward) / np.where(dist > 0.0, dist, 1.0)
+    r = props.range
+
+    if props.light_type == 'SUN':
+        reached = np.ones(len(coords), dtype=bool)
+        base = np.maximum(cos, 0.0)
+    else:
+        reached = dist <= r
+        base = np.maximum(0.0, 1.0 - dist / r)
+        if props.light_type == 'SPOT':
+            inside = (cos >= np.cos(radians(props.spot_angle))) | (dist == 0.0)
+            base = np.where(inside, base, 0.0)
+        elif props.light_type == 'AREA':
+            inv = np.array(emit_matrix.inverted())
+            local = coords @ inv[:3, :3].T + inv[:3, 3]
+            depth = -local[:, 2]
+            inside = ((np.abs(local[:, 0]) <= props.area_x / 2) & (np.abs(local[:, 1]) <= props.area_y / 2)
+                      & (depth >= 0.0) & (depth <= r))
+            base = np.where(inside, np.maximum(0.0, 1.0 - depth / r), 0.0)
+
+    factor = base * props.strength
+    if props.paint_mode == 'SHARP':
+        factor = factor ** 2
+    elif props.paint_mode == 'DIRTY':
+        factor = factor * 0.5
+    return reached, factor
+
+
+class VertexGrid:
+    """Uniform grid over vertex positions answering sphere queries."""
+
+    # Boxes spanning more cell columns than this fall back to every vertex
+    MAX_COLUMNS = 4096
+
+    def __init__(self, coords, cell):
+        self.count = len(coords)
+        self.origin = coords.min(axis=0) if self.count else np.zeros(3)
+        extent = coords.max(axis=0) - self.origin if self.count else np.zeros(3)
+        # Keep the grid at most ~256 cells per axis
+        self.cell = max(cell, float(extent.max()) / 256.0, 1e-6)
+        q = np.floor((coords - self.origin) / self.cell).astype(np.int64)
+        self.dims = q.max(axis=0) + 1 if self.count else np.ones(3, dtype=np.int64)
+        keys = (q[:, 0] * self.dims[1] + q[:, 1]) * self.dims[2] + q[:, 2]
+        self.order = np.argsort(keys, kind='stable').astype(np.int32)
+        self.keys = keys[self.order]
+
+    def query(self, center, radius):
+        """Indices of the vertices in the cells overlapping a sphere (a superset)."""
+        lo = np.floor((center - radius - self.origin) / self.cell).astype(np.int64)
+        hi = np.floor((center + radius - self.origin) / self.cell).astype(np.int64)
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, self.dims - 1)
+        if (lo > hi).any():
+            return np.empty(0, dtype=np.int32)
+        xs = np.arange(lo[0], hi[0] + 1)
+        ys = np.arange(lo[1], hi[1] + 1)
+        if len(xs) * len(ys) > self.MAX_COLUMNS:
+            return np.arange(self.count, dtype=np.int32)
+        # Each (x, y) column of cells is one contiguous key range
+        columns = (xs[:, None] * self.dims[1] + ys[None, :]).ravel() * self.dims[2]
+        starts = np.searchsorted(self.keys, columns + lo[2], side='left')
+        ends = np.searchsorted(self.keys, columns + hi[2], side='right')
+        if not len(starts):
+            return np.empty(0, dtype=np.int32)
+        return self.order[np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])]
+
+
 class VLP_OT_paint_modal(bpy.types.Operator):
     """Start the modal vertex-light painting session."""
     bl_idname = "vlp.paint_modal"
@@ -141,32 +335,38 @@ class VLP_OT_paint_modal(bpy.types.Operator):
                          or ca.new(name=name + "Save", type='BYTE_COLOR', domain='POINT')) if props.has_saved else None
                 use_point = True
 
-            # Build KDTree for distance queries
-            size = len(mesh.vertices)
-            kd = KDTree(size)
-            coords = []
-            for i, v in enumerate(mesh.vertices):
-                co = obj.matrix_world @ v.co
-                coords.append(co)
-                kd.insert(co, i)
-            kd.balance()
-
-            # Map vertex to loop indices
-            loop_map = {}
-            for poly in mesh.polygons:
-                for li in poly.loop_indices:
-                    vidx = mesh.loops[li].vertex_index
-                    loop_map.setdefault(vidx, []).append(li)
-
-            self.targets.append((mesh, live, saved, kd, coords, loop_map, obj, use_point))
+            # Local-space vertices, vertex -> loops map (CSR) and grid
+            geometry, _rebuilt = target_geometry(obj, props.range)
+            base_colors = initial_colors(live, saved)
+
+            self.targets.append({
+                "mesh": mesh, "live": live, "saved": saved, "obj": obj, "use_point": use_point,
+                "geometry": geometry,
+                "base": base_colors,
+                # Current contents of the live layer and the vertices lit last tick
+                "colors": base_colors.copy(),
+                "lit": None,
+            })
 
         # Initialize
         props.running = True
-        props.last_loc = tuple(props.emitter.matrix_world.translation)
-        props.last_rot = tuple(props.emitter.matrix_world.to_quaternion())
+        self.event_mode = props.update_mode == 'EVENT'
+        self.watched = {props.emitter.name}
+        for target in self.targets:
+            self.watched.update((target["obj"].name, target["mesh"].name))
+        self._last_loc = props.emitter.matrix_world.translation.copy()
+        self._last_rot = props.emitter.matrix_world.to_quaternion()
+
+        _dirty_geometry.clear()
+        _painted.clear()
+        _session.update(op=self, repaint=False, verify=False)
+        if track_depsgraph_updates not in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.append(track_depsgraph_updates)
 
         wm = context.window_manager
-        self._timer = wm.event_timer_add(props.refresh_rate, window=context.window)
+        self._timer = None
+        if not self.event_mode:
+            self._timer = wm.event_timer_add(props.refresh_rate, window=context.window)
         wm.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
@@ -176,99 +376,109 @@ class VLP_OT_paint_modal(bpy.types.Operator):
             self.cancel(context)
             return {'CANCELLED'}
 
-        if event.type == 'TIMER':
+        if event.type == 'TIMER' and self._timer:
             loc = props.emitter.matrix_world.translation
             rot = props.emitter.matrix_world.to_quaternion()
-            if (loc - mathutils.Vector(props.last_loc)).length > 1e-4 or rot != mathutils.Quaternion(props.last_rot):
-                props.last_loc = tuple(loc)
-                props.last_rot = tuple(rot)
+            # Last pose is kept on the operator: no RNA writes while polling
+            if (loc - self._last_loc).length > 1e-4 or rot != self._last_rot:
+                self._last_loc = loc.copy()
+                self._last_rot = rot
                 self.paint_vertices(context, props)
         return {'PASS_THROUGH'}
 
     def cancel(self, context):
-        """Stop and clean up the timer."""
-        context.window_manager.event_timer_remove(self._timer)
+        """Stop and clean up the timer and depsgraph handler."""
+        if self._timer:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        if track_depsgraph_updates in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(track_depsgraph_updates)
+        if bpy.app.timers.is_registered(flush_paint):
+            bpy.app.timers.unregister(flush_paint)
+        _painted.clear()
+        _session.update(op=None, repaint=False, verify=False)
 
     def paint_vertices(self, context, props):
         """Apply color to target meshes based on emitter settings."""
-        emit_loc = props.emitter.matrix_world.translation
-        emit_col = props.color
-        forward = props.emitter.matrix_world.to_quaternion() @ mathutils.Vector((0, 1, 0))
-        lt = props.light_type
-        r = props.range
-
-        for mesh, live, saved, kd, coords, loop_map, obj, use_point in self.targets:
-            # Reset to saved or black
-            if not use_point:
-                default = [l.color for l in (saved.data if saved else [])]
-                for i, loop in enumerate(live.data):
-                    loop.color = default[i] if default else (0, 0, 0, 1)
-            else:
-                default = [c.color for c in (saved.data if saved else [])]
-                for i, vc in enumerate(live.data):
-                    vc.color = default[i] if default else (0, 0, 0, 1)
-
-            # SUN mode
-            if lt == 'SUN':
-                for vidx, co in enumerate(coords):
-                    base = max(0.0, forward.dot((co - emit_loc).normalized()))
-                    factor = (base * props.strength) ** (2 if props.paint_mode == 'SHARP' else 1) \
-                             * (0.5 if props.paint_mode == 'DIRTY' else 1)
-                    if not use_point:
-                        for li in loop_map.get(vidx, []):
-                            old = live.data[li].color
-                            new = [
-                                min(1, old[i] + (emit_col[i] - old[i]) * factor)
-                                if not props.darken else
-                                min(1, old[i] + (emit_col[i] - old[i]) * factor * 0.5)
-                                for i in range(3)
-                            ]
-                            live.data[li].color = (*new, 1)
-                    else:
-                        old = live.data[vidx].color
-                        new = [
-                            min(1, old[i] + (emit_col[i] - old[i]) * factor)
-                            for i in range(3)
-                        ]
-                        live.data[vidx].color = (*new, 1)
-                continue
-
-            # Other modes: POINT, SPOT, AREA
-            for co, vidx, dist in kd.find_range(emit_loc, r):
-                if lt == 'POINT':
-                    base = max(0.0, 1 - dist / r)
-                elif lt == 'SPOT':
-                    angle = forward.angle((co - emit_loc).normalized())
-                    base = max(0.0, 1 - dist / r) if angle <= radians(props.spot_angle) else 0.0
-                elif lt == 'AREA':
-                    locl = props.emitter.matrix_world.inverted() @ co
-                    x, y, z = locl
-                    base = max(0.0, 1 - (-z) / r) if abs(x) <= props.area_x/2 and abs(y) <= props.area_y/2 and 0 <= -z <= r else 0.0
-                else:
-                    base = 0.0
-
-                factor = (base * props.strength) ** (2 if props.paint_mode == 'SHARP' else 1) \
-                         * (0.5 if props.paint_mode == 'DIRTY' else 1)
-
-                if not use_point:
-                    for li in loop_map.get(vidx, []):
-                        old = live.data[li].color
-                        new = [
-                            min(1, old[i] + (emit_col[i] - old[i]) * factor)
-                            for i in range(3)
-                        ]
-                        live.data[li].color = (*new, 1)
-                else:
-                    old = live.data[vidx].color
-                    new = [
-                        min(1, old[i] + (emit_col[i] - old[i]) * factor)
-                        for i in range(3)
-                    ]
-                    live.data[vidx].color = (*new, 1)
+        emit_col = np.array(props.color, dtype=np.float32)
+        self.refresh_dirty_targets(props)
+        for target in self.targets:
+            self.paint_target(target, props, emit_col)
 
         # Redraw 3D view
-        if context.area and context.area.type == 'VIEW_3D':
-            context.area.tag_redraw()
+        tag_view3d_redraw(context)
+
+    def refresh_dirty_targets(self, props):
+        """Verify targets with reported geometry updates; True if any was rebuilt."""
+        rebuilt = False
+        for target in self.targets:
+            if target["obj"].name in _dirty_geometry or target["mesh"].name in _dirty_geometry:
+                rebuilt |= self.refresh_target(target, props)
+        _dirty_geometry.clear()
+        return rebuilt
+
+    def refresh_target(self, target, props):
+        """Rebuild a target whose geometry really changed (our own color writes do not count)."""
+        geometry, rebuilt = target_geometry(target["obj"], props.range)
+        if not rebuilt:
+            return False
+        target["geometry"] = geometry
+        if len(target["base"]) != len(target["live"].data):
+            target["base"] = initial_colors(target["live"], target["saved"])
+        target["colors"] = target["base"].copy()
+        target["lit"] = None
+        return True
+
+
+    def paint_target(self, target, props, emit_col):
+        """Relight one target, touching only the region lit now or last tick."""
+        geometry = target["geometry"]
+        local = geometry["local"]
+        matrix = props.emitter.matrix_world
+        obj_mat = np.array(target["obj"].matrix_world)
+        full = props.light_type == 'SUN' or target["lit"] is None
+        if full:
+            candidates = np.arange(len(local), dtype=np.int32)
+        else:
+            # Query in the target's local space so moving it costs nothing;
+            # a world sphere of radius r fits in r / smallest scale locally
+            inv = np.linalg.inv(obj_mat)
+            center = inv[:3, :3] @ np.array(matrix.translation) + inv[:3, 3]
+            scale = np.linalg.svd(obj_mat[:3, :3], compute_uv=False).min()
+            candidates = geometry["grid"].query(center, props.range / max(scale, 1e-12))
+
+        coords = local[candidates] @ obj_mat[:3, :3].T + obj_mat[:3, 3]
+        reached, factor = light_factors(props, coords, matrix)
+        lit = candidates[reached]
+        factor = factor[reached]
+        previous = target["lit"]
+        target["lit"] = lit
+
+        colors = target["colors"]
+        base = target["base"]
+        use_point = target["use_point"]
+        if full:
+            colors[:] = base
+        else:
+            dirty = np.union1d(previous, lit)
+            if not len(dirty):
+                return
+            if not use_point:
+                dirty = csr_loops(*geometry["loop_csr"], dirty)[0]
+            colors[dirty] = base[dirty]
+
+        if not use_point:
+            if props.light_type == 'SUN' and props.darken:
+                factor = factor * 0.5
+            lit, owner = csr_loops(*geometry["loop_csr"], lit)
+            factor = factor[owner]
+
+        old = colors[lit, :3]
+        colors[lit, :3] = np.minimum(1.0, old + (emit_col - old) * factor[:, None])
+        colors[lit, 3] = 1.0
+        write_colors(target["live"], colors)
+        target["mesh"].update()
+        _painted.update((target["obj"].name, target["mesh"].name))
 
 class VLP_OT_stop_paint(bpy.types.Operator):
     """Stop the modal vertex-light painting session."""
@@ -297,14 +507,12 @@ class VLP_OT_save_layer(bpy.types.Operator):
             if mesh.vertex_colors and name in mesh.vertex_colors:
                 live = mesh.vertex_colors[name]
                 saved = mesh.vertex_colors.get(save_name) or mesh.vertex_colors.new(name=save_name)
-                for i, loop in enumerate(live.data):
-                    saved.data[i].color = loop.color
+                write_colors(saved, read_colors(live))
             elif mesh.color_attributes and name in mesh.color_attributes:
                 ca = mesh.color_attributes
                 live = ca[name]
                 saved = ca.get(save_name) or ca.new(name=save_name, type='BYTE_COLOR', domain='POINT')
-                for i, vc in enumerate(live.data):
-                    saved.data[i].color = vc.color
+                write_colors(saved, read_colors(live))
 
         props.has_saved = True
         self.report({'INFO'}, f"Layer saved as '{save_name}'")
@@ -361,6 +569,7 @@ class VLP_PT_panel(bpy.types.Panel):
         if props.light_type == 'AREA':
             layout.prop(props, 'area_x')
             layout.prop(props, 'area_y')
+        layout.prop(props, 'update_mode', text='Updates')
         layout.prop(props, 'refresh_rate')
         layout.prop(props, 'darken')
 
@@ -389,8 +598,17 @@ def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     bpy.types.Scene.vlp_props = bpy.props.PointerProperty(type=VLPProperties)
+    bpy.app.handlers.load_post.append(clear_targets_on_load)
 
 def unregister():
+    if clear_targets_on_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_targets_on_load)
+    if track_depsgraph_updates in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(track_depsgraph_updates)
+    if bpy.app.timers.is_registered(flush_paint):
+        bpy.app.timers.unregister(flush_paint)
+    _session.update(op=None, repaint=False, verify=False)
+    TARGET_CACHE.clear()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.vlp_props
@@ -0,0 +1,313 @@
+import numpy as np
+
+# -----------------------------
+# Fine-Tune parameters
+# -----------------------------
+# The 21 vc_* object properties driving the Fine-Tune stack, with the value
+# each one is reset to.
+FINE_TUNE_DEFAULTS = {
+    "vc_levels_offset": 0.0, "vc_levels_gain": 1.0,
+    "vc_hue": 0.5, "vc_saturation": 1.0, "vc_value": 1.0,
+    "vc_brightness": 0.0, "vc_contrast": 0.0,
+    "vc_gamma": 1.0, "vc_exposure": 0.0,
+    "vc_posterize": 0.0, "vc_vibrant": 1.0,
+    "vc_noise": 0.0,
+    "vc_shadows_balance": 0.0, "vc_midtones_balance": 0.0, "vc_highlights_balance": 0.0,
+    "vc_curve_shadows": 0.0, "vc_curve_midtones": 0.5, "vc_curve_highlights": 1.0,
+    "vc_channel_r": False, "vc_channel_g": False, "vc_channel_b": False,
+}
+
+
+def fine_tune_params(obj):
+    """Collect the current Fine-Tune values of an object into a dict."""
+    return {name: getattr(obj, name) for name in FINE_TUNE_DEFAULTS}
+
+
+# -----------------------------
+# Color & Curve Helpers
+# -----------------------------
+def apply_balance(c, shadows, midtones, highlights):
+    """Apply simple shadows/midtones/highlights balance to channel values."""
+    return np.where(
+        c < 0.333, c + shadows * (0.333 - c) / 0.333,
+        np.where(c < 0.666, c + midtones * (0.666 - c) / 0.333,
+                 c + highlights * (1.0 - c) / 0.334)
+    )
+
+
+def apply_curve_point(c, shadow_pt, mid_pt, highlight_pt):
+    """Simple 3-point curve interpolation with safeguards contra división por cero."""
+    # Si mid_pt está en 0, evitamos dividir por cero y escalamos linealmente
+    if mid_pt <= 0.0:
+        return c * shadow_pt
+    # Si mid_pt está en 1, evitamos dividir por cero en la segunda rama
+    if mid_pt >= 1.0:
+        return shadow_pt + (c - mid_pt) * (highlight_pt - shadow_pt)
+    return np.where(
+        c < mid_pt,
+        (c / mid_pt) * shadow_pt,
+        shadow_pt + ((c - mid_pt) / (1.0 - mid_pt)) * (highlight_pt - shadow_pt)
+    )
+
+
+# -----------------------------
+# Paint operator equivalents
+# -----------------------------
+# Same math as paint.vertex_color_levels, paint.vertex_color_hsv and
+# paint.vertex_color_brightness_contrast, applied to (N, 3) linear RGB.
+def apply_levels(rgb, offset, gain):
+    """Levels: gain * (c + offset)."""
+    return gain * (rgb + offset)
+
+
+def rgb_to_hsv(rgb):
+    """Vectorized RGB -> HSV with hue in [0, 1)."""
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    v = rgb.max(axis=1)
+    chroma = v - rgb.min(axis=1)
+    safe = np.where(chroma > 0.0, chroma, 1.0)
+    h = np.where(
+        v == r, ((g - b) / safe) % 6.0,
+        np.where(v == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0)
+    ) / 6.0
+    h = np.where(chroma > 0.0, h, 0.0)
+    s = chroma / (v + 1e-20)
+    return h, s, v
+
+
+def hsv_to_rgb(h, s, v):
+    """Vectorized HSV -> RGB matching Blender's hsv_to_rgb."""
+    h6 = h * 6.0
+    nr = np.clip(np.abs(h6 - 3.0) - 1.0, 0.0, 1.0)
+    ng = np.clip(2.0 - np.abs(h6 - 2.0), 0.0, 1.0)
+    nb = np.clip(2.0 - np.abs(h6 - 4.0), 0.0, 1.0)
+    return np.stack([((nr - 1.0) * s + 1.0) * v,
+                     ((ng - 1.0) * s + 1.0) * v,
+                     ((nb - 1.0) * s + 1.0) * v], axis=1)
+
+
+def apply_hsv(rgb, hue, saturation, value):
+    """HSV shift: hue offset around 0.5, saturation and value multipliers."""
+    h, s, v = rgb_to_hsv(rgb)
+    h = h + (hue - 0.5)
+    h = np.where(h > 1.0, h - 1.0, np.where(h < 0.0, h + 1.0, h))
+    return hsv_to_rgb(h, s * saturation, v * value)
+
+
+def apply_brightness_contrast(rgb, brightness, contrast):
+    """Brightness/contrast using the same gain/offset derivation as Blender."""
+    brightness /= 100.0
+    delta = contrast / 200.0
+    if contrast > 0:
+        gain = 1.0 / max(1.0 - delta * 2.0, np.finfo(np.float32).eps)
+        offset = gain * (brightness - delta)
+    else:
+        delta = -delta
+        gain = max(1.0 - delta * 2.0, 0.0)
+        offset = gain * brightness + delta
+    return gain * rgb + offset
+
+
+# -----------------------------
+# Vectorized Fine-Tune engine
+# -----------------------------
+# The stack is a fixed sequence of stages.  Each stage maps an (N, 3) RGB
+# array to a new one (or returns its input untouched when its parameters
+# are neutral, so identity stages cost no memory) and only depends on the
+# parameters listed next to it.
+def _stage_levels(rgb, p, env):
+    if p["vc_levels_offset"] == 0.0 and p["vc_levels_gain"] == 1.0:
+        return rgb
+    rgb = apply_levels(rgb, p["vc_levels_offset"], p["vc_levels_gain"])
+    return np.clip(rgb, 0.0, 1.0) if env["byte_color"] else rgb
+
+
+def _stage_hsv(rgb, p, env):
+    if p["vc_hue"] == 0.5 and p["vc_saturation"] == 1.0 and p["vc_value"] == 1.0:
+        return rgb
+    rgb = apply_hsv(rgb, p["vc_hue"], p["vc_saturation"], p["vc_value"])
+    return np.clip(rgb, 0.0, 1.0) if env["byte_color"] else rgb
+
+
+def _stage_brightness_contrast(rgb, p, env):
+    if p["vc_brightness"] == 0.0 and p["vc_contrast"] == 0.0:
+        return rgb
+    rgb = apply_brightness_contrast(rgb, p["vc_brightness"], p["vc_contrast"])
+    return np.clip(rgb, 0.0, 1.0) if env["byte_color"] else rgb
+
+
+# -----------------------------
+# Per-channel curves
+# -----------------------------
+# Gamma, exposure and posterize (before vibrance) and balance plus the RGB
+# curve (after noise) are the same pure function on every channel, so each
+# group runs as one vectorized curve over all channel values.  Lookup
+# tables do not pay off here: the curves are a few array operations, and
+# by the time values reach them earlier stages have moved them off any
+# fixed grid a table could be gathered on.
+
+
+def tone_curve(c, p):
+    """Gamma, exposure and posterize on channel values."""
+    gamma = p["vc_gamma"]
+    inv_gamma = 1.0 / gamma if gamma != 0 else 1.0
+    if inv_gamma != 1.0:
+        c = np.power(np.maximum(c, 0.0), inv_gamma)
+    if p["vc_exposure"] != 0.0:
+        c = c * (2.0 ** p["vc_exposure"])
+    levels = p["vc_posterize"]
+    if levels > 1:
+        c = np.round(c * (levels - 1)) / (levels - 1)
+    return c
+
+
+def grade_curve(c, p):
+    """Color balance, RGB curve and the final clamp on channel values."""
+    c = apply_balance(c, p["vc_shadows_balance"],
+                      p["vc_midtones_balance"], p["vc_highlights_balance"])
+    c = apply_curve_point(c, p["vc_curve_shadows"],
+                          p["vc_curve_midtones"], p["vc_curve_highlights"])
+    return np.clip(c, 0.0, 1.0)
+
+
+def _stage_tone(rgb, p, env):
+    if p["vc_gamma"] == 1.0 and p["vc_exposure"] == 0.0 and p["vc_posterize"] <= 1:
+        return rgb
+    return tone_curve(rgb, p)
+
+
+def _stage_vibrance(rgb, p, env):
+    vib = p["vc_vibrant"]
+    if vib == 0.0:
+        return rgb
+    sat = rgb.max(axis=1, keepdims=True) - rgb.min(axis=1, keepdims=True)
+    avg = rgb.mean(axis=1, keepdims=True)
+    return rgb + (rgb - avg) * (vib * (1 - sat))
+
+
+def _stage_noise(rgb, p, env):
+    noise_amp = p["vc_noise"]
+    if noise_amp <= 0.0:
+        return rgb
+    noise = env["rng"].uniform(-noise_amp, noise_amp, rgb.shape)
+    return rgb + noise.astype(np.float32)
+
+
+def _stage_grade(rgb, p, env):
+    return grade_curve(rgb, p)
+
+
+def _stage_channels(rgb, p, env):
+    # Channel toggles: masked select between adjusted and incoming values
+    mask = np.array([p["vc_channel_r"], p["vc_channel_g"], p["vc_channel_b"]])
+    return np.where(mask, rgb, env["pre"])
+
+
+# Levels, HSV and brightness/contrast always affect all channels; the
+# remaining stages only reach the channels enabled by the R/G/B toggles.
+PAINT_STAGES = (
+    (_stage_levels, ("vc_levels_offset", "vc_levels_gain")),
+    (_stage_hsv, ("vc_hue", "vc_saturation", "vc_value")),
+    (_stage_brightness_contrast, ("vc_brightness", "vc_contrast")),
+)
+CHANNEL_STAGES = (
+    (_stage_tone, ("vc_gamma", "vc_exposure", "vc_posterize")),
+    (_stage_vibrance, ("vc_vibrant",)),
+    (_stage_noise, ("vc_noise",)),
+    (_stage_grade, ("vc_shadows_balance", "vc_midtones_balance", "vc_highlights_balance",
+                    "vc_curve_shadows", "vc_curve_midtones", "vc_curve_highlights")),
+    (_stage_channels, ("vc_channel_r", "vc_channel_g", "vc_channel_b")),
+)
+FINE_TUNE_STAGES = PAINT_STAGES + CHANNEL_STAGES
+
+
+def channels_enabled(params):
+    """True when at least one of the R/G/B toggles is on."""
+    return params["vc_channel_r"] or params["vc_channel_g"] or params["vc_channel_b"]
+
+
+class FineTuneCache:
+    """Memoized stage outputs of the Fine-Tune stack for one source buffer.
+
+    Each entry holds the parameter key a stage was evaluated with and its
+    output.  Re-evaluating walks the stages and reuses outputs while keys
+    keep matching, so dragging a late slider only recomputes from that
+    stage onward.  Outputs from the first stage whose key changed since the
+    previous call are not kept, as the next drag of the same slider
+    replaces them anyway.  A different source array or storage type starts
+    over.
+    """
+
+    def __init__(self):
+        self.source = None
+        self.byte_color = None
+        self.entries = []
+        self.keys = []
+        self.rng = np.random.default_rng()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the cached source and stage outputs."""
+        arrays = [self.source] + [rgb for _key, rgb in self.entries]
+        # Neutral stages pass their input through, so count each buffer once
+        owned = {id(a): a for a in arrays if a is not None and a.base is None}
+        return sum(a.nbytes for a in owned.values())
+
+    def clear(self):
+        self.source = None
+        self.entries = []
+        self.keys = []
+
+    def evaluate(self, source, params, byte_color=False):
+        """Return the adjusted (N, 4) colors for ``source``."""
+        if source is not self.source or byte_color != self.byte_color:
+            self.clear()
+            self.source = source
+            self.byte_color = byte_color
+        count = len(PAINT_STAGES)
+        if channels_enabled(params):
+            count = len(FINE_TUNE_STAGES)
+        env = {"byte_color": self.byte_color, "rng": self.rng, "pre": None}
+        rgb = source[:, :3]
+        stage_keys = []
+        for i, (stage, keys) in enumerate(FINE_TUNE_STAGES[:count]):
+            key = tuple(params[k] for k in keys)
+            stage_keys.append(key)
+            if i < len(self.entries) and self.entries[i][0] == key:
+                rgb = self.entries[i][1]
+            else:
+                del self.entries[i:]
+                rgb = stage(rgb, params, env)
+                self.entries.append((key, rgb))
+            if i == len(PAINT_STAGES) - 1:
+                env["pre"] = rgb
+        if self.keys:
+            for i, key in enumerate(stage_keys):
+                if i >= len(self.keys) or self.keys[i] != key:
+                    del self.entries[i:]
+                    break
+        self.keys = stage_keys
+        out = np.array(source, dtype=np.float32)
+        out[:, :3] = rgb
+        return out
+
+
+def apply_fine_tune(colors, params, rng=None, byte_color=False):
+    """Run the Fine-Tune stack on an (N, 4) color array and return the result.
+
+    ``params`` maps every key of FINE_TUNE_DEFAULTS to its value.  With
+    ``byte_color`` the paint stages clamp to [0, 1] like a BYTE_COLOR
+    attribute does between operators.
+    """
+    colors = np.asarray(colors, dtype=np.float32)
+    env = {"byte_color": byte_color, "rng": rng or np.random.default_rng(), "pre": None}
+    rgb = colors[:, :3]
+    for stage, _keys in PAINT_STAGES:
+        rgb = stage(rgb, params, env)
+    env["pre"] = rgb
+    if channels_enabled(params):
+        for stage, _keys in CHANNEL_STAGES:
+            rgb = stage(rgb, params, env)
+    out = colors.copy()
+    out[:, :3] = rgb
+    return out
@@ -1,29 +1,50 @@
 import bpy
-import random
 import json
 import re
 import math
-import mathutils
+import numpy as np
 from collections import defaultdict
+from contextlib import contextmanager
+from bpy.app.handlers import persistent
 from bpy_extras.io_utils import ExportHelper, ImportHelper
+from .buffer_vcol import (
+    read_colors, write_colors, read_corner_colors, write_corner_colors,
+    loop_vertex_indices, polygon_loop_ranges, is_byte_layer, ColorBufferStore,
+)
+from .finetune_vcol import FINE_TUNE_DEFAULTS, FineTuneCache, apply_fine_tune, fine_tune_params
 
 # -----------------------------
 # Globals
 # -----------------------------
 vertex_data_store = {}
-vertex_backup_store = {}
+# Backups live as compact arrays (uint8 for BYTE_COLOR) under a memory budget
+vertex_backup_store = ColorBufferStore()
 saved_values = {}
-vertex_backup_store = {}
 _vc_gradient_copy_data = {}
 _vc_gradient_presets = {}
+fine_tune_cache = {}
+gradient_param_cache = {}
+# Object / mesh names whose colors the gradient just wrote; the geometry
+# update that write causes keeps their cached projection
+_gradient_written = set()
+_pending_live_updates = set()
+_live_update_batch = {"depth": 0, "fine_tune": {}, "gradient": {}}
 # -----------------------------
 # Helpers
 # -----------------------------
-def vc_gradient_live_update(self, context):
+def refresh_gradient(obj, context):
     try:
-        bpy.ops.object.vc_set_gradient()
+        with context.temp_override(object=obj, active_object=obj):
+            bpy.ops.object.vc_set_gradient()
     except Exception:
         pass
+
+def vc_gradient_live_update(self, context):
+    obj = self.id_data
+    if _live_update_batch["depth"]:
+        _live_update_batch["gradient"].setdefault(obj.name, False)
+        return None
+    refresh_gradient(obj, context)
     return None
 
 def ensure_vertex_color_attribute(obj):
@@ -48,19 +69,45 @@ def run_in_vertex_paint_mode(operator_func, **kwargs):
 
 def backup_vertex_colors(obj):
     attr = ensure_vertex_color_attribute(obj)
-    vertex_backup_store[obj.name] = [tuple(lc.color) for lc in attr.data]
+    vertex_backup_store.budget_bytes = bpy.context.scene.vc_backup_budget_mb * 2**20
+    vertex_backup_store.put(obj.name, attr)
+    fine_tune_cache.pop(obj.name, None)
+
+def drop_vertex_backup(obj):
+    """Forget the backup of an object together with its cached Fine-Tune stages."""
+    vertex_backup_store.pop(obj.name)
+    fine_tune_cache.pop(obj.name, None)
+    gradient_param_cache.pop(obj.name, None)
 
 def restore_vertex_colors(obj):
     if obj.name not in vertex_backup_store:
         return
     attr = ensure_vertex_color_attribute(obj)
-    backup = vertex_backup_store[obj.name]
-    # Solo iteramos hasta el mínimo entre loops actuales y datos guardados
-    count = min(len(attr.data), len(backup))
-    for i in range(count):
-        attr.data[i].color = backup[i]
+    # Solo restauramos hasta el mínimo entre loops actuales y datos guardados
+    vertex_backup_store.restore(obj.name, attr)
     obj.data.update()
 
+def trim_fine_tune_cache(keep):
+    """Drop least recently used Fine-Tune caches over the backup budget.
+
+    Caches count against ``vc_backup_budget_mb`` together with the backups
+    held in memory; the cache of ``keep`` is never dropped.
+    """
+    total = vertex_backup_store.nbytes + sum(c.nbytes for c in fine_tune_cache.values())
+    for name in list(fine_tune_cache):
+        if total <= vertex_backup_store.budget_bytes:
+            break
+        if name != keep:
+            total -= fine_tune_cache.pop(name).nbytes
+
+@persistent
+def clear_backups_on_load(dummy):
+    """Backups are keyed by object name and must not leak into another file."""
+    vertex_backup_store.clear()
+    fine_tune_cache.clear()
+    gradient_param_cache.clear()
+    _gradient_written.clear()
+
 
 def linear_to_srgb(c):
     if c <= 0.0031308:
@@ -77,121 +124,99 @@ def sample_update(self, context):
         if area.type == 'VIEW_3D':
             area.tag_redraw()
 
-# -----------------------------
-# Color & Curve Helpers
-# -----------------------------
-def apply_balance(c, shadows, midtones, highlights):
-    """Apply simple shadows/midtones/highlights balance to channel."""
-    if c < 0.333:
-        return c + shadows * (0.333 - c) / 0.333
-    elif c < 0.666:
-        return c + midtones * (0.666 - c) / 0.333
-    else:
-        return c + highlights * (1.0 - c) / 0.334
-
-def apply_curve_point(c, shadow_pt, mid_pt, highlight_pt):
-    """Simple 3-point curve interpolation with safeguards contra división por cero."""
-    # Si mid_pt está en 0, evitamos dividir por cero y devolvemos el valor en shadow_pt escalado linealmente
-    if mid_pt <= 0.0:
-        return c * shadow_pt
-    # Si mid_pt está en 1, evitamos dividir por cero en la segunda rama
-    if mid_pt >= 1.0:
-        return shadow_pt + (c - mid_pt) * (highlight_pt - shadow_pt)
-
-    if c < mid_pt:
-        # División segura porque mid_pt > 0
-        return (c / mid_pt) * shadow_pt
-    else:
-        denom = 1.0 - mid_pt
-        # denom > 0 porque mid_pt < 1
-        return shadow_pt + ((c - mid_pt) / denom) * (highlight_pt - shadow_pt)
-
 # -----------------------------
 # Main Update
 # -----------------------------
 def update_vertex_colors(obj, context):
     if obj.name not in vertex_backup_store:
         backup_vertex_colors(obj)
-    restore_vertex_colors(obj)
-
-    # Pre-paint operations
-    bpy.ops.object.mode_set(mode='VERTEX_PAINT')
-    bpy.ops.paint.vertex_color_levels(offset=obj.vc_levels_offset, gain=obj.vc_levels_gain)
-    bpy.ops.paint.vertex_color_hsv(h=obj.vc_hue, s=obj.vc_saturation, v=obj.vc_value)
-    bpy.ops.paint.vertex_color_brightness_contrast(brightness=obj.vc_brightness, contrast=obj.vc_contrast)
-    bpy.ops.object.mode_set(mode='OBJECT')
-
     attr = ensure_vertex_color_attribute(obj)
-    use_r = obj.vc_channel_r
-    use_g = obj.vc_channel_g
-    use_b = obj.vc_channel_b
-
-    for lc in attr.data:
-        # Store original
-        orig_r, orig_g, orig_b, a = lc.color
-        r, g, b = orig_r, orig_g, orig_b
-
-        # --- Apply all adjustments to temp variables ---
-        # Gamma correction
-        gamma = obj.vc_gamma
-        inv_gamma = 1.0 / gamma if gamma != 0 else 1.0
-        r, g, b = (pow(c, inv_gamma) for c in (r, g, b))
-
-        # Exposure
-        expo = 2.0 ** obj.vc_exposure
-        r, g, b = (c * expo for c in (r, g, b))
-
-        # Posterize
-        levels = obj.vc_posterize
-        if levels > 1:
-            r = round(r * (levels - 1)) / (levels - 1)
-            g = round(g * (levels - 1)) / (levels - 1)
-            b = round(b * (levels - 1)) / (levels - 1)
-
-        # Vibrance
-        vib = obj.vc_vibrant
-        mx = max(r, g, b); mn = min(r, g, b)
-        sat = mx - mn
-        adjustment = vib * (1 - sat)
-        avg = (r + g + b) / 3
-        r += (r - avg) * adjustment
-        g += (g - avg) * adjustment
-        b += (b - avg) * adjustment
-
-        # Noise
-        noise_amp = obj.vc_noise
-        r += random.uniform(-noise_amp, noise_amp)
-        g += random.uniform(-noise_amp, noise_amp)
-        b += random.uniform(-noise_amp, noise_amp)
-
-        # Color Balance
-        r = apply_balance(r, obj.vc_shadows_balance, obj.vc_midtones_balance, obj.vc_highlights_balance)
-        g = apply_balance(g, obj.vc_shadows_balance, obj.vc_midtones_balance, obj.vc_highlights_balance)
-        b = apply_balance(b, obj.vc_shadows_balance, obj.vc_midtones_balance, obj.vc_highlights_balance)
-
-        # RGB Curves
-        r = apply_curve_point(r, obj.vc_curve_shadows, obj.vc_curve_midtones, obj.vc_curve_highlights)
-        g = apply_curve_point(g, obj.vc_curve_shadows, obj.vc_curve_midtones, obj.vc_curve_highlights)
-        b = apply_curve_point(b, obj.vc_curve_shadows, obj.vc_curve_midtones, obj.vc_curve_highlights)
-
-        # --- Apply channel toggles ---
-        final_r = modified_r = min(max(r, 0.0), 1.0)
-        final_g = modified_g = min(max(g, 0.0), 1.0)
-        final_b = modified_b = min(max(b, 0.0), 1.0)
-
-        r_out = modified_r if use_r else orig_r
-        g_out = modified_g if use_g else orig_g
-        b_out = modified_b if use_b else orig_b
-
-        lc.color = (r_out, g_out, b_out, a)
 
+    # The whole stack (levels, HSV and brightness/contrast included) runs on
+    # the backup in one vectorized pass, without leaving OBJECT mode.  Stage
+    # outputs are cached per object so only stages after the first changed
+    # parameter are recomputed.
+    params = fine_tune_params(obj)
+    if vertex_backup_store.count(obj.name) == len(attr.data):
+        # Re-inserting keeps fine_tune_cache in least-recently-used order
+        cache = fine_tune_cache.pop(obj.name, None) or FineTuneCache()
+        fine_tune_cache[obj.name] = cache
+        # The cache keeps the decoded backup; it is dropped whenever the backup changes
+        backup = cache.source if cache.source is not None else vertex_backup_store.get(obj.name)
+        colors = cache.evaluate(backup, params, byte_color=is_byte_layer(attr))
+        trim_fine_tune_cache(obj.name)
+    else:
+        # Topology changed since the backup was taken
+        fine_tune_cache.pop(obj.name, None)
+        restore_vertex_colors(obj)
+        colors = apply_fine_tune(read_colors(attr), params, byte_color=is_byte_layer(attr))
+    write_colors(attr, colors)
     obj.data.update()
     context.view_layer.update()
 
 
+# -----------------------------
+# Live update scheduler
+# -----------------------------
+def flush_live_updates():
+    """Timer callback: run one recompute per object with its settled values."""
+    names = list(_pending_live_updates)
+    _pending_live_updates.clear()
+    for name in names:
+        obj = bpy.data.objects.get(name)
+        if obj and obj.type == 'MESH' and obj.show_vc_fine_tune:
+            update_vertex_colors(obj, bpy.context)
+    return None
+
+def schedule_live_update(obj, context):
+    """Coalesce slider changes so each object recomputes at most once per interval."""
+    interval = context.scene.vc_live_update_interval
+    if interval <= 0.0:
+        update_vertex_colors(obj, context)
+        return
+    _pending_live_updates.add(obj.name)
+    if not bpy.app.timers.is_registered(flush_live_updates):
+        bpy.app.timers.register(flush_live_updates, first_interval=interval)
+
 def live_update(self, context):
-    if self.show_vc_fine_tune:
-        update_vertex_colors(self, context)
+    if _live_update_batch["depth"]:
+        _live_update_batch["fine_tune"].setdefault(self.name, False)
+    elif self.show_vc_fine_tune:
+        schedule_live_update(self, context)
+
+@contextmanager
+def suspend_live_updates(context, fine_tune=(), gradient=()):
+    """Hold back live updates while properties are written in bulk.
+
+    Objects touched inside the block are recomputed once on exit; those
+    passed in ``fine_tune`` / ``gradient`` are recomputed even if no
+    property update fired for them.  Blocks may be nested.
+    """
+    batch = _live_update_batch
+    batch["depth"] += 1
+    for obj in fine_tune:
+        batch["fine_tune"][obj.name] = True
+    for obj in gradient:
+        batch["gradient"][obj.name] = True
+    try:
+        yield
+    finally:
+        batch["depth"] -= 1
+        if batch["depth"] == 0:
+            pending_fine_tune, batch["fine_tune"] = batch["fine_tune"], {}
+            pending_gradient, batch["gradient"] = batch["gradient"], {}
+    if batch["depth"]:
+        return
+
+    for name, forced in pending_fine_tune.items():
+        obj = bpy.data.objects.get(name)
+        if obj and obj.type == 'MESH' and (forced or obj.show_vc_fine_tune):
+            _pending_live_updates.discard(name)
+            update_vertex_colors(obj, context)
+    for name in pending_gradient:
+        obj = bpy.data.objects.get(name)
+        if obj and obj.type == 'MESH':
+            refresh_gradient(obj, context)
 
 # -----------------------------
 # Panel redesign
@@ -247,6 +272,8 @@ class VertexColorPanel(bpy.types.Panel):
         # Fine Tune Settings
         layout.operator("object.vc_show_fine_tune", text="Fine‑Tune Settings", icon='PREFERENCES')
         if obj.show_vc_fine_tune:
+            layout.prop(scene, "vc_live_update_interval", text="Update Interval")
+            layout.prop(scene, "vc_backup_budget_mb", text="Backup Budget (MB)")
             col = layout.column(align=True)
             for prop_name in [
                 "vc_levels_offset", "vc_levels_gain", "vc_hue",
@@ -369,9 +396,9 @@ class VCInvert(bpy.types.Operator):
         obj = context.object
         if obj and obj.type == 'MESH':
             attr = ensure_vertex_color_attribute(obj)
-            for lc in attr.data:
-                r, g, b, a = lc.color
-                lc.color = (1-r, 1-g, 1-b, a)
+            colors = read_colors(attr)
+            colors[:, :3] = 1.0 - colors[:, :3]
+            write_colors(attr, colors)
             obj.data.update()
         return {'FINISHED'}
 
@@ -410,12 +437,13 @@ class VCSharpColor(bpy.types.Operator):
         attr = ensure_vertex_color_attribute(obj)
         mesh = obj.data
         # For each polygon, compute average vertex‑color and apply to all its loops
-        for poly in mesh.polygons:
-            # collect existing colors
-            cols = [attr.data[li].color[:3] for li in poly.loop_indices]
-            avg = [sum(ch) / len(ch) for ch in zip(*cols)]
-            for li in poly.loop_indices:
-                attr.data[li].color = (*avg, attr.data[li].color[3])
+        colors = read_corner_colors(mesh, attr)
+        starts, totals = polygon_loop_ranges(mesh)
+        if len(starts):
+            sums = np.add.reduceat(colors[:, :3], starts, axis=0)
+            avg = sums / totals[:, None]
+            colors[:, :3] = np.repeat(avg, totals, axis=0)
+            write_corner_colors(mesh, attr, colors)
         mesh.update()
         return {'FINISHED'}
 
@@ -429,12 +457,9 @@ class VCCleanColor(bpy.types.Operator):
             return {'CANCELLED'}
         attr = ensure_vertex_color_attribute(obj)
         # Lighten each loop's color by +0.2 (clamped to [0,1])
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            lc.color = (min(r + 0.2, 1.0),
-                        min(g + 0.2, 1.0),
-                        min(b + 0.2, 1.0),
-                        a)
+        colors = read_colors(attr)
+        colors[:, :3] = np.minimum(colors[:, :3] + 0.2, 1.0)
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -465,23 +490,14 @@ class VCAcceptChanges(bpy.types.Operator):
     bl_label = "Apply Fine‑Tune"
     bl_description = "Apply new values to active mesh"
     def execute(self, context):
-        for obj in context.selected_objects:
-            if obj.show_vc_fine_tune:
-                update_vertex_colors(obj, context)
-                vertex_backup_store.pop(obj.name, None)
-                for prop, val in (
-                    ("vc_levels_offset",0.0), ("vc_levels_gain",1.0),
-                    ("vc_hue",0.5), ("vc_saturation",1.0), ("vc_value",1.0),
-                    ("vc_brightness",0.0), ("vc_contrast",0.0),
-                    ("vc_gamma",1.0), ("vc_exposure",0.0),
-                    ("vc_posterize",0.0), ("vc_vibrant",1.0),
-                    ("vc_noise",0.0),
-                    ("vc_shadows_balance",0.0), ("vc_midtones_balance",0.0), ("vc_highlights_balance",0.0),
-                    ("vc_curve_shadows",0.0), ("vc_curve_midtones",0.5), ("vc_curve_highlights",1.0),
-                    ("vc_channel_r", False), ("vc_channel_g", False), ("vc_channel_b", False),
-                ):
-                    setattr(obj, prop, val)
-                obj.show_vc_fine_tune = False
+        with suspend_live_updates(context):
+            for obj in context.selected_objects:
+                if obj.show_vc_fine_tune:
+                    update_vertex_colors(obj, context)
+                    drop_vertex_backup(obj)
+                    for prop, val in FINE_TUNE_DEFAULTS.items():
+                        setattr(obj, prop, val)
+                    obj.show_vc_fine_tune = False
         return {'FINISHED'}
 
 class VCCancelChanges(bpy.types.Operator):
@@ -489,23 +505,14 @@ class VCCancelChanges(bpy.types.Operator):
     bl_label = "Cancel Fine‑Tune"
     bl_description = "Cancel new values to active mesh"
     def execute(self, context):
-        for obj in context.selected_objects:
-            if obj.show_vc_fine_tune:
-                restore_vertex_colors(obj)
-                vertex_backup_store.pop(obj.name, None)
-                for prop, val in (
-                    ("vc_levels_offset",0.0), ("vc_levels_gain",1.0),
-                    ("vc_hue",0.5), ("vc_saturation",1.0), ("vc_value",1.0),
-                    ("vc_brightness",0.0), ("vc_contrast",0.0),
-                    ("vc_gamma",1.0), ("vc_exposure",0.0),
-                    ("vc_posterize",0.0), ("vc_vibrant",1.0),
-                    ("vc_noise",0.0),
-                    ("vc_shadows_balance",0.0), ("vc_midtones_balance",0.0), ("vc_highlights_balance",0.0),
-                    ("vc_curve_shadows",0.0), ("vc_curve_midtones",0.5), ("vc_curve_highlights",1.0),
-                    ("vc_channel_r", False), ("vc_channel_g", False), ("vc_channel_b", False),
-                ):
-                    setattr(obj, prop, val)
-                obj.show_vc_fine_tune = False
+        with suspend_live_updates(context):
+            for obj in context.selected_objects:
+                if obj.show_vc_fine_tune:
+                    restore_vertex_colors(obj)
+                    drop_vertex_backup(obj)
+                    for prop, val in FINE_TUNE_DEFAULTS.items():
+                        setattr(obj, prop, val)
+                    obj.show_vc_fine_tune = False
         return {'FINISHED'}
 
 class VCResetValues(bpy.types.Operator):
@@ -513,21 +520,11 @@ class VCResetValues(bpy.types.Operator):
     bl_label = "Reset Fine‑Tune Sliders"
     bl_description = "Resets current values to default"
     def execute(self, context):
-        for obj in context.selected_objects:
-            if obj.show_vc_fine_tune:
-                for prop, val in (
-                    ("vc_levels_offset",0.0), ("vc_levels_gain",1.0),
-                    ("vc_hue",0.5), ("vc_saturation",1.0), ("vc_value",1.0),
-                    ("vc_brightness",0.0), ("vc_contrast",0.0),
-                    ("vc_gamma",1.0), ("vc_exposure",0.0),
-                    ("vc_posterize",0.0), ("vc_vibrant",1.0),
-                    ("vc_noise",0.0),
-                    ("vc_shadows_balance",0.0), ("vc_midtones_balance",0.0), ("vc_highlights_balance",0.0),
-                    ("vc_curve_shadows",0.0), ("vc_curve_midtones",0.5), ("vc_curve_highlights",1.0),
-                    ("vc_channel_r", False), ("vc_channel_g", False), ("vc_channel_b", False),
-                ):
+        targets = [obj for obj in context.selected_objects if obj.show_vc_fine_tune]
+        with suspend_live_updates(context, fine_tune=targets):
+            for obj in targets:
+                for prop, val in FINE_TUNE_DEFAULTS.items():
                     setattr(obj, prop, val)
-                update_vertex_colors(obj, context)
         return {'FINISHED'}
 
 class VCSaveValues(bpy.types.Operator):
@@ -537,15 +534,7 @@ class VCSaveValues(bpy.types.Operator):
     def execute(self, context):
         obj = context.object
         if obj and obj.type == 'MESH':
-            for prop in (
-                "vc_levels_offset","vc_levels_gain","vc_hue",
-                "vc_saturation","vc_value","vc_brightness","vc_contrast",
-                "vc_gamma","vc_exposure","vc_posterize","vc_vibrant","vc_noise",
-                "vc_shadows_balance","vc_midtones_balance","vc_highlights_balance",
-                "vc_curve_shadows","vc_curve_midtones","vc_curve_highlights",
-                "vc_channel_r","vc_channel_g","vc_channel_b"
-            ):
-                saved_values[prop] = getattr(obj, prop)
+            saved_values.update(fine_tune_params(obj))
             self.report({'INFO'}, "Values saved")
         return {'FINISHED'}
 
@@ -557,16 +546,27 @@ class VCApplySavedValues(bpy.types.Operator):
         if not saved_values:
             self.report({'WARNING'}, "No saved values")
             return {'CANCELLED'}
-        for obj in context.selected_objects:
-            if obj.type == 'MESH':
+        targets = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        with suspend_live_updates(context, fine_tune=targets):
+            for obj in targets:
                 for prop, val in saved_values.items():
                     setattr(obj, prop, val)
-                update_vertex_colors(obj, context)
         return {'FINISHED'}
 
 # -----------------------------
 # Animate Handlers & Ops
 # -----------------------------
+def snapshot_loop_records(obj, frame):
+    """Build the per-loop records stored in vertex_data_store for one frame."""
+    attr = ensure_vertex_color_attribute(obj)
+    colors = read_colors(attr).tolist()
+    vidx = loop_vertex_indices(obj.data).tolist()
+    return [
+        {'object': obj.name, 'frame': frame, 'loop_index': i,
+         'vertex_index': vidx[i], 'color': tuple(col)}
+        for i, col in enumerate(colors)
+    ]
+
 def update_vertex_colors_handler(scene):
     if bpy.context.screen.is_animation_playing:
         return
@@ -582,11 +582,11 @@ def update_vertex_colors_handler(scene):
                     if m:
                         li, ch = int(m.group(1)), fc.array_index
                         evals.setdefault(li, {})[ch] = fc.evaluate(scene.frame_current)
+                colors = read_colors(attr)
                 for li, chans in evals.items():
-                    col = list(attr.data[li].color)
                     for ch, v in chans.items():
-                        col[ch] = v
-                    attr.data[li].color = tuple(col)
+                        colors[li, ch] = v
+                write_colors(attr, colors)
                 mesh.update()
 
 def auto_store_data_handler(scene):
@@ -596,13 +596,8 @@ def auto_store_data_handler(scene):
         if obj.vc_animate_enabled and obj.animation_data and obj.animation_data.action:
             if any(int(kp.co.x) == scene.frame_current for fc in obj.animation_data.action.fcurves for kp in fc.keyframe_points):
                 frame = scene.frame_current
-                attr = ensure_vertex_color_attribute(obj)
                 key = (obj.name, frame)
-                vertex_data_store[key] = [
-                    {'object': obj.name, 'frame': frame, 'loop_index': i,
-                     'vertex_index': obj.data.loops[i].vertex_index, 'color': tuple(lc.color)}
-                    for i, lc in enumerate(attr.data)
-                ]
+                vertex_data_store[key] = snapshot_loop_records(obj, frame)
 
 def validate_color_keyframes_handler(scene):
     if not bpy.context.screen.is_animation_playing:
@@ -661,9 +656,12 @@ class VCToggleAnimate(bpy.types.Operator):
                 if obj and obj.vc_animate_enabled:
                     attr = ensure_vertex_color_attribute(obj)
                     scene.frame_set(frm)
+                    colors = read_colors(attr)
+                    for e in data:
+                        colors[e['loop_index']] = e['color']
+                    write_colors(attr, colors)
                     for e in data:
-                        i, col = e['loop_index'], e['color']
-                        attr.data[i].color = col
+                        i = e['loop_index']
                         for ch in range(4):
                             obj.data.keyframe_insert(f'color_attributes["Attribute"].data[{i}].color', frame=frm, index=ch)
                     obj.data.update()
@@ -693,13 +691,8 @@ class VCStoreData(bpy.types.Operator):
             context.scene.frame_set(frm)
             for obj in context.selected_objects:
                 if obj.vc_animate_enabled:
-                    attr = ensure_vertex_color_attribute(obj)
                     key = (obj.name, frm)
-                    vertex_data_store[key] = [
-                        {'object': obj.name, 'frame': frm, 'loop_index': i,
-                         'vertex_index': obj.data.loops[i].vertex_index, 'color': tuple(lc.color)}
-                        for i, lc in enumerate(attr.data)
-                    ]
+                    vertex_data_store[key] = snapshot_loop_records(obj, frm)
         self.report({'INFO'}, f"Data stored for frames: {sorted(frames)}")
         return {'FINISHED'}
 
@@ -720,13 +713,8 @@ class VCApplyAnimate(bpy.types.Operator):
             scene.frame_set(frm)
             for obj in context.selected_objects:
                 if obj.vc_animate_enabled:
-                    attr = ensure_vertex_color_attribute(obj)
                     key = (obj.name, frm)
-                    vertex_data_store[key] = [
-                        {'object': obj.name, 'frame': frm, 'loop_index': i,
-                         'vertex_index': obj.data.loops[i].vertex_index, 'color': tuple(lc.color)}
-                        for i, lc in enumerate(attr.data)
-                    ]
+                    vertex_data_store[key] = snapshot_loop_records(obj, frm)
         scene.frame_set(0)
         for obj in context.selected_objects:
             if obj.vc_animate_enabled:
@@ -770,13 +758,12 @@ class VCAddFrame(bpy.types.Operator):
                 attr = ensure_vertex_color_attribute(obj)
                 if obj.name not in vertex_backup_store:
                     backup_vertex_colors(obj)
-                backup = vertex_backup_store[obj.name]
-                for i, lc in enumerate(attr.data):
-                    curr = tuple(lc.color)
-                    if curr != backup[i]:
-                        for ch in range(4):
-                            obj.data.keyframe_insert(f'color_attributes["Attribute"].data[{i}].color', frame=frame, index=ch)
-                        backup[i] = curr
+                changed = vertex_backup_store.changed_indices(obj.name, attr)
+                for i in changed.tolist():
+                    for ch in range(4):
+                        obj.data.keyframe_insert(f'color_attributes["Attribute"].data[{i}].color', frame=frame, index=ch)
+                if len(changed):
+                    backup_vertex_colors(obj)
                 obj.data.update()
                 for prop in (
                     "vc_levels_offset","vc_levels_gain","vc_hue","vc_saturation","vc_value",
@@ -868,9 +855,12 @@ class VCLoadAnimatedData(bpy.types.Operator, ImportHelper):
         for frm, lst in sorted(frames.items()):
             scene.frame_set(frm)
             attr = ensure_vertex_color_attribute(obj)
+            colors = read_colors(attr)
+            for e in lst:
+                colors[e['loop_index']] = e['color']
+            write_colors(attr, colors)
             for e in lst:
-                i, col = e['loop_index'], e['color']
-                attr.data[i].color = col
+                i = e['loop_index']
                 for ch in range(4):
                     obj.data.keyframe_insert(f'color_attributes["Attribute"].data[{i}].color',
                                              frame=frm, index=ch)
@@ -889,29 +879,90 @@ class VCShowGradient(bpy.types.Operator):
             if obj.type == 'MESH':
                 if obj.show_vc_gradient:
                     # Si estaba activado y ahora se desactiva, restaurar
-                    backup = vertex_backup_store.get(obj.name)
-                    if backup:
-                        attr = ensure_vertex_color_attribute(obj)
-                        for i, color in enumerate(backup):
-                            attr.data[i].color = color[:]
-                        obj.data.update()
-                        vertex_backup_store.pop(obj.name, None)
+                    if obj.name in vertex_backup_store:
+                        restore_vertex_colors(obj)
+                        drop_vertex_backup(obj)
                     obj.show_vc_gradient = False
                 else:
                     # Si se va a activar, hacer respaldo
-                    attr = ensure_vertex_color_attribute(obj)
-                    vertex_backup_store[obj.name] = [v.color[:] for v in attr.data]
+                    backup_vertex_colors(obj)
                     obj.show_vc_gradient = True
         return {'FINISHED'}
 
 
+# -----------------------------
+# Gradient evaluation
+# -----------------------------
+def gradient_parameter(obj, axis_key):
+    """Normalized gradient position of every loop for 'X', 'Y', 'Z' or 'RADIAL'.
+
+    The result only depends on geometry, so it is cached per object while
+    stops are edited.  The cache is keyed by mesh, element counts,
+    matrix_world and axis; drop_stale_gradient_params drops it when the
+    depsgraph reports a geometry update.
+    """
+    mesh = obj.data
+    mat = np.array(obj.matrix_world)
+    key = (mesh.name, len(mesh.vertices), len(mesh.loops), tuple(mat.ravel()), axis_key)
+    cached = gradient_param_cache.get(obj.name)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    count = len(mesh.vertices)
+    co = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    vidx = loop_vertex_indices(mesh)
+
+    world = co.reshape(count, 3) @ mat[:3, :3].T + mat[:3, 3]
+
+    if axis_key in {'X', 'Y', 'Z'}:
+        vals = world[:, 'XYZ'.index(axis_key)]
+        # El rango se mide sobre los vértices que usan los loops
+        used = vals[vidx]
+        mn, mx = used.min(), used.max()
+    else:  # RADIAL
+        center = world.mean(axis=0)
+        vals = np.linalg.norm(world - center, axis=1)
+        mn, mx = vals.min(), vals.max()
+    span = mx - mn if mx != mn else 1.0
+    t = ((vals - mn) / span)[vidx]
+    gradient_param_cache[obj.name] = (key, t)
+    return t
+
+@persistent
+def drop_stale_gradient_params(scene, depsgraph):
+    """depsgraph_update_post handler forgetting projections of edited meshes.
+
+    The first geometry update after the gradient wrote an object's colors
+    is its own write and is ignored.
+    """
+    changed = {update.id.original.name for update in depsgraph.updates
+               if update.is_updated_geometry} - _gradient_written
+    _gradient_written.clear()
+    if not changed:
+        return
+    for name, (key, _t) in list(gradient_param_cache.items()):
+        if name in changed or key[0] in changed:
+            del gradient_param_cache[name]
+
+def gradient_ramp(t, stops, invert=False):
+    """Piecewise-linear color of every position in ``t``; alpha is always 1."""
+    # Ordenar las paradas por posición (factor); fuera de rango se usa el extremo
+    stops = sorted(stops, key=lambda s: s.factor)
+    if invert:
+        t = 1.0 - t
+    factors = [s.factor for s in stops]
+    colors = np.ones((len(t), 4), dtype=np.float32)
+    for ch in range(3):
+        colors[:, ch] = np.interp(t, factors, [s.color[ch] for s in stops])
+    return colors
+
 class VCGradientColor(bpy.types.Operator):
     bl_idname = "object.vc_set_gradient"
     bl_label = "Gradient Color"
     bl_description = "Applys custom gradient values to active mesh"
 
     def execute(self, context):
-        import mathutils
         obj = context.object
         mesh = obj.data
         attr = ensure_vertex_color_attribute(obj)
@@ -924,61 +975,14 @@ class VCGradientColor(bpy.types.Operator):
         if len(obj.vc_gradient_stops) < 2:
             self.report({'WARNING'}, "Se necesitan al menos dos paradas de color para el gradiente.")
             return {'CANCELLED'}
+        if not mesh.loops:
+            return {'FINISHED'}
 
-        # Ordenar las paradas por posición (factor)
-        stops = sorted(obj.vc_gradient_stops, key=lambda s: s.factor)
-
-        def lerp_color(t):
-            if invert:
-                t = 1.0 - t
-            for i in range(len(stops) - 1):
-                f0 = stops[i].factor
-                f1 = stops[i + 1].factor
-                if f0 <= t <= f1:
-                    local_t = (t - f0) / (f1 - f0) if f1 != f0 else 0.0
-                    c0 = stops[i].color
-                    c1 = stops[i + 1].color
-                    return (
-                        c0[0] + local_t * (c1[0] - c0[0]),
-                        c0[1] + local_t * (c1[1] - c0[1]),
-                        c0[2] + local_t * (c1[2] - c0[2]),
-                        1.0
-                    )
-            # Fuera de rango
-            if t < stops[0].factor:
-                c = stops[0].color
-            else:
-                c = stops[-1].color
-            return (c[0], c[1], c[2], 1.0)
-
-        # Obtener coordenadas mundiales por vértice
-        coords = [obj.matrix_world @ mesh.vertices[loop.vertex_index].co for loop in mesh.loops]
-
-        if axis_key in {'X', 'Y', 'Z'}:
-            idx = 'XYZ'.index(axis_key)
-            vals = [co[idx] for co in coords]
-            mn, mx = min(vals), max(vals)
-            span = mx - mn if mx != mn else 1.0
-
-            for loop in mesh.loops:
-                co = obj.matrix_world @ mesh.vertices[loop.vertex_index].co
-                t = (co[idx] - mn) / span
-                attr.data[loop.index].color = lerp_color(t)
-
-        else:  # RADIAL
-            bbox = [obj.matrix_world @ v.co for v in mesh.vertices]
-            center = sum(bbox, mathutils.Vector()) / len(bbox)
-            dists = [(co - center).length for co in bbox]
-            mn, mx = min(dists), max(dists)
-            span = mx - mn if mx != mn else 1.0
-
-            for loop in mesh.loops:
-                co = obj.matrix_world @ mesh.vertices[loop.vertex_index].co
-                d = (co - center).length
-                t = (d - mn) / span
-                attr.data[loop.index].color = lerp_color(t)
-
+        t = gradient_parameter(obj, axis_key)
+        colors = gradient_ramp(t, obj.vc_gradient_stops, invert)
+        write_corner_colors(mesh, attr, colors)
         mesh.update()
+        _gradient_written.update((obj.name, mesh.name))
         return {'FINISHED'}
 
     
@@ -1008,19 +1012,20 @@ class VCAddGradientStop(bpy.types.Operator):
     def execute(self, context):
         obj = context.object
         stops = obj.vc_gradient_stops
-        # Añadimos con un color por defecto (por ej. copia de la última existente)
-        default_color = stops[-1].color if stops else (1.0,1.0,1.0)
-        stops.add().color = default_color
-
-        # Recalcular factores equidistantes
-        N = len(stops)
-        if N > 1:
-            for idx, stop in enumerate(stops):
-                stop.factor = idx / (N - 1)
-
-        # Dejar seleccionada la última
-        obj.vc_gradient_stop_index = N - 1
-        vc_gradient_live_update(self, context)
+        # Un solo recálculo del gradiente al terminar
+        with suspend_live_updates(context, gradient=[obj]):
+            # Añadimos con un color por defecto (por ej. copia de la última existente)
+            default_color = stops[-1].color if stops else (1.0,1.0,1.0)
+            stops.add().color = default_color
+
+            # Recalcular factores equidistantes
+            N = len(stops)
+            if N > 1:
+                for idx, stop in enumerate(stops):
+                    stop.factor = idx / (N - 1)
+
+            # Dejar seleccionada la última
+            obj.vc_gradient_stop_index = N - 1
         return {'FINISHED'}
 
 class VCRemoveGradientStop(bpy.types.Operator):
@@ -1032,17 +1037,18 @@ class VCRemoveGradientStop(bpy.types.Operator):
         obj = context.object
         stops = obj.vc_gradient_stops
         idx = obj.vc_gradient_stop_index
-        stops.remove(idx)
-
-        # Recalcular factores equidistantes
-        N = len(stops)
-        if N > 1:
-            for i, stop in enumerate(stops):
-                stop.factor = i / (N - 1)
-
-        # Ajustar índice
-        obj.vc_gradient_stop_index = min(idx, N - 1)
-        vc_gradient_live_update(self, context)
+        # Un solo recálculo del gradiente al terminar
+        with suspend_live_updates(context, gradient=[obj]):
+            stops.remove(idx)
+
+            # Recalcular factores equidistantes
+            N = len(stops)
+            if N > 1:
+                for i, stop in enumerate(stops):
+                    stop.factor = i / (N - 1)
+
+            # Ajustar índice
+            obj.vc_gradient_stop_index = min(idx, N - 1)
         return {'FINISHED'}
     
 class VCApplyGradient(bpy.types.Operator):
@@ -1054,7 +1060,7 @@ class VCApplyGradient(bpy.types.Operator):
         for obj in context.selected_objects:
             if obj.type == 'MESH' and obj.show_vc_gradient:
                 # Eliminar backup una vez aplicada
-                vertex_backup_store.pop(obj.name, None)
+                drop_vertex_backup(obj)
                 obj.show_vc_gradient = False
         return {'FINISHED'}
 
@@ -1065,14 +1071,9 @@ class VCCancelGradient(bpy.types.Operator):
     def execute(self, context):
         for obj in context.selected_objects:
             if obj.type == 'MESH' and obj.show_vc_gradient:
-                backup = vertex_backup_store.get(obj.name)
-                if backup is not None:
-                    attr = ensure_vertex_color_attribute(obj)
-                    for i, color in enumerate(backup):
-                        attr.data[i].color = color[:]
-                    obj.data.update()
+                restore_vertex_colors(obj)
                 obj.show_vc_gradient = False
-                vertex_backup_store.pop(obj.name, None)
+                drop_vertex_backup(obj)
         return {'FINISHED'}
     
 _vc_gradient_copy_data = {}
@@ -1106,20 +1107,20 @@ class VCPasteGradientValues(bpy.types.Operator):
             self.report({'WARNING'}, "No hay valores copiados")
             return {'CANCELLED'}
 
-        # Asignamos axis
-        obj.vc_gradient_axis = data['axis']
+        with suspend_live_updates(context, gradient=[obj]):
+            # Asignamos axis
+            obj.vc_gradient_axis = data['axis']
 
-        # Reemplazamos paradas
-        stops = obj.vc_gradient_stops
-        stops.clear()
-        for factor, color in data['stops']:
-            new = stops.add()
-            new.factor = factor
-            new.color = color
+            # Reemplazamos paradas
+            stops = obj.vc_gradient_stops
+            stops.clear()
+            for factor, color in data['stops']:
+                new = stops.add()
+                new.factor = factor
+                new.color = color
 
-        # Ajustamos índice y forzamos live update
-        obj.vc_gradient_stop_index = len(stops) - 1
-        vc_gradient_live_update(self, context)
+            # Ajustamos índice; el live update se ejecuta una vez al salir
+            obj.vc_gradient_stop_index = len(stops) - 1
 
         self.report({'INFO'}, "Gradient values pasted")
         return {'FINISHED'}
@@ -1174,15 +1175,15 @@ class VCApplyGradientPreset(bpy.types.Operator):
             self.report({'WARNING'}, f"Preset '{name}' not found in internal store")
             return {'CANCELLED'}
         obj = context.object
-        obj.vc_gradient_axis = data['axis']
-        stops = obj.vc_gradient_stops
-        stops.clear()
-        for f, color in data['stops']:
-            new = stops.add()
-            new.factor = f
-            new.color = color
-        obj.vc_gradient_stop_index = len(stops) - 1
-        vc_gradient_live_update(self, context)
+        with suspend_live_updates(context, gradient=[obj]):
+            obj.vc_gradient_axis = data['axis']
+            stops = obj.vc_gradient_stops
+            stops.clear()
+            for f, color in data['stops']:
+                new = stops.add()
+                new.factor = f
+                new.color = color
+            obj.vc_gradient_stop_index = len(stops) - 1
         return {'FINISHED'}
     
 # --- Data structure for presets in Scene ---
@@ -1302,12 +1303,13 @@ class VCImportJson(bpy.types.Operator, ImportHelper):
             return {'CANCELLED'}
 
         # Import axis & stops
-        obj.vc_gradient_axis = data.get('axis', obj.vc_gradient_axis)
-        obj.vc_gradient_stops.clear()
-        for factor, color in data.get('stops', []):
-            st = obj.vc_gradient_stops.add()
-            st.factor = factor
-            st.color = color
+        with suspend_live_updates(context):
+            obj.vc_gradient_axis = data.get('axis', obj.vc_gradient_axis)
+            obj.vc_gradient_stops.clear()
+            for factor, color in data.get('stops', []):
+                st = obj.vc_gradient_stops.add()
+                st.factor = factor
+                st.color = color
 
         # Import presets
         _vc_gradient_presets.clear()
@@ -1330,10 +1332,9 @@ class VCGrayscale(bpy.types.Operator):
     def execute(self, context):
         obj = context.object
         attr = ensure_vertex_color_attribute(obj)
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            gray = (r + g + b) / 3.0
-            lc.color = (gray, gray, gray, a)
+        colors = read_colors(attr)
+        colors[:, :3] = colors[:, :3].mean(axis=1, keepdims=True)
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -1344,12 +1345,12 @@ class VCSepia(bpy.types.Operator):
     def execute(self, context):
         obj = context.object
         attr = ensure_vertex_color_attribute(obj)
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            tr = min(0.393*r + 0.769*g + 0.189*b, 1.0)
-            tg = min(0.349*r + 0.686*g + 0.168*b, 1.0)
-            tb = min(0.272*r + 0.534*g + 0.131*b, 1.0)
-            lc.color = (tr, tg, tb, a)
+        colors = read_colors(attr)
+        sepia = np.array([[0.393, 0.769, 0.189],
+                          [0.349, 0.686, 0.168],
+                          [0.272, 0.534, 0.131]], dtype=np.float32)
+        colors[:, :3] = np.minimum(colors[:, :3] @ sepia.T, 1.0)
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -1362,14 +1363,9 @@ class VCCartoon(bpy.types.Operator):
         attr = ensure_vertex_color_attribute(obj)
         # Posteriza en 4 niveles por canal
         levels = 4
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            lc.color = (
-                round(r * (levels-1)) / (levels-1),
-                round(g * (levels-1)) / (levels-1),
-                round(b * (levels-1)) / (levels-1),
-                a
-            )
+        colors = read_colors(attr)
+        colors[:, :3] = np.round(colors[:, :3] * (levels-1)) / (levels-1)
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -1381,17 +1377,14 @@ class VCHot(bpy.types.Operator):
         import math
         obj = context.object
         attr = ensure_vertex_color_attribute(obj)
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            # Escala la luminancia a rojo–amarillo–blanco
-            lum = (r + g + b) / 3.0
-            if lum < 0.5:
-                t = lum * 2
-                color = (t, 0, 0)
-            else:
-                t = (lum - 0.5) * 2
-                color = (1.0, t, 0)
-            lc.color = (*color, a)
+        colors = read_colors(attr)
+        # Escala la luminancia a rojo–amarillo–blanco
+        lum = colors[:, :3].mean(axis=1)
+        low = lum < 0.5
+        colors[:, 0] = np.where(low, lum * 2, 1.0)
+        colors[:, 1] = np.where(low, 0.0, (lum - 0.5) * 2)
+        colors[:, 2] = 0.0
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -1403,16 +1396,13 @@ class VCCold(bpy.types.Operator):
         import math
         obj = context.object
         attr = ensure_vertex_color_attribute(obj)
-        for lc in attr.data:
-            r, g, b, a = lc.color
-            lum = (r + g + b) / 3.0
-            if lum < 0.5:
-                t = lum * 2
-                color = (0, 0, t)
-            else:
-                t = (lum - 0.5) * 2
-                color = (0, 1.0 - t, 1.0)
-            lc.color = (*color, a)
+        colors = read_colors(attr)
+        lum = colors[:, :3].mean(axis=1)
+        low = lum < 0.5
+        colors[:, 0] = 0.0
+        colors[:, 1] = np.where(low, 0.0, 1.0 - (lum - 0.5) * 2)
+        colors[:, 2] = np.where(low, lum * 2, 1.0)
+        write_colors(attr, colors)
         obj.data.update()
         return {'FINISHED'}
 
@@ -1579,11 +1569,23 @@ def register():
         default=False,
         description="Toggle visibility of gradient preset list"
     )
+    bpy.types.Scene.vc_live_update_interval = bpy.props.FloatProperty(
+        name="Live Update Interval",
+        description="Minimum seconds between Fine-Tune recomputes while dragging sliders (0 updates immediately)",
+        default=0.05, min=0.0, max=1.0
+    )
+    bpy.types.Scene.vc_backup_budget_mb = bpy.props.IntProperty(
+        name="Backup Budget",
+        description="Memory kept for color backups and cached Fine-Tune stages; older backups are spilled to temporary files and older caches dropped",
+        default=1024, min=16, max=65536
+    )
 
     # Handlers
     bpy.app.handlers.frame_change_post.append(update_vertex_colors_handler)
     bpy.app.handlers.frame_change_post.append(auto_store_data_handler)
     bpy.app.handlers.frame_change_post.append(validate_color_keyframes_handler)
+    bpy.app.handlers.load_post.append(clear_backups_on_load)
+    bpy.app.handlers.depsgraph_update_post.append(drop_stale_gradient_params)
     bpy.context.scene.sync_mode = 'FRAME_DROP'
 
 
@@ -1592,6 +1594,14 @@ def unregister():
     for h in (update_vertex_colors_handler, auto_store_data_handler, validate_color_keyframes_handler):
         if h in bpy.app.handlers.frame_change_post:
             bpy.app.handlers.frame_change_post.remove(h)
+    if clear_backups_on_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_backups_on_load)
+    if drop_stale_gradient_params in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(drop_stale_gradient_params)
+    clear_backups_on_load(None)
+    if bpy.app.timers.is_registered(flush_live_updates):
+        bpy.app.timers.unregister(flush_live_updates)
+    _pending_live_updates.clear()
 
     # Unregister classes (orden inverso)
     for cls in reversed(classes):
@@ -1613,6 +1623,8 @@ def unregister():
     del bpy.types.Scene.vc_gradient_presets
     del bpy.types.Scene.vc_gradient_preset_index
     del bpy.types.Scene.show_vc_preset_list
+    del bpy.types.Scene.vc_live_update_interval
+    del bpy.types.Scene.vc_backup_budget_mb
 
 if __name__ == "__main__":
     register()
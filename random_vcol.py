@@ -1,7 +1,9 @@
 import bpy
 import random
 import json
+import numpy as np
 from bpy_extras.io_utils import ExportHelper, ImportHelper
+from .buffer_vcol import write_colors, polygon_loop_ranges
 
 # ------------------------------
 # Custom Color Items & Presets
@@ -441,25 +443,33 @@ class VLP_OT_randomize_vertex_colors(bpy.types.Operator):
             mesh.vertex_colors.active_index = idx_vc
             vcol = mesh.vertex_colors[idx_vc]
 
+            # Random draws keep the original per-face / per-loop order so a
+            # given seed still produces the same colors
+            num_loops = len(mesh.loops)
+            colors = np.ones((num_loops, 4), dtype=np.float32)
             if mode == 'SOLID':
-                for poly in mesh.polygons:
-                    color = [random.random() for _ in range(3)] + [1.0]
-                    for li in poly.loop_indices:
-                        vcol.data[li].color = color
+                _, totals = polygon_loop_ranges(mesh)
+                face_rgb = np.array(
+                    [[random.random() for _ in range(3)] for _ in range(len(totals))],
+                    dtype=np.float32
+                ).reshape(-1, 3)
+                colors[:, :3] = np.repeat(face_rgb, totals, axis=0)
 
             elif mode == 'DIFFUSE':
-                for poly in mesh.polygons:
-                    for li in poly.loop_indices:
-                        vcol.data[li].color = [random.random() for _ in range(3)] + [1.0]
+                colors[:, :3] = np.array(
+                    [random.random() for _ in range(num_loops * 3)],
+                    dtype=np.float32
+                ).reshape(-1, 3)
 
             else:  # CUSTOM
                 if not props.custom_colors:
                     self.report({'WARNING'}, "No custom colors defined")
                     break
-                for poly in mesh.polygons:
-                    for li in poly.loop_indices:
-                        cc = random.choice(props.custom_colors).color
-                        vcol.data[li].color = (*cc[:3], 1.0)
+                palette = np.array([cc.color[:3] for cc in props.custom_colors], dtype=np.float32)
+                choice = [random.randrange(len(palette)) for _ in range(num_loops)]
+                colors[:, :3] = palette[np.array(choice, dtype=np.int32)]
+
+            write_colors(vcol, colors)
 
             if props.smooth:
                 bpy.ops.object.mode_set(mode='VERTEX_PAINT')
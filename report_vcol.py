@@ -1,14 +1,43 @@
 import bpy 
+import os
+import hashlib
 import numpy as np
+from mathutils.kdtree import KDTree
+from collections import deque
+from bpy.app.handlers import persistent
+from .buffer_vcol import (
+    read_colors, write_colors, is_byte_layer, read_compact_colors, write_compact_colors,
+)
+from .finetune_vcol import rgb_to_hsv
 
-# maps color-index → list of (object_name, loop_index)
-COLOR_LOOP_MAP = {}
+# undo history, newest last: each snapshot maps object_name to either
+# ('loops', loop_indices, original_colors) or ('palette', palette, inverse)
+UNDO_HISTORY = deque()
 
-# list of (object_name, loop_index, original_color) for undo
-ORIGINAL_COLOR_MAP = []
+# object_name -> compact color array (uint8 for 8-bit layers) for Save/Apply Saved
+SAVED_COLOR_MAP = {}
 
-# list of (object_name, loop_index, saved_color) for Save/Apply Saved
-SAVED_COLOR_MAP = []
+# palette found by the last report: unique colors, loops per color and,
+# per object name, the palette index of every loop
+PALETTE_COLORS = np.empty((0, 4), dtype=np.float32)
+PALETTE_COUNTS = np.empty(0, dtype=np.int64)
+PALETTE_INVERSE = {}
+
+# full palette as edited in the UI and the filtered/sorted palette indices
+# of the list view; only one page of it is mirrored into scene.vcr_colors
+PALETTE_EDITED = np.empty((0, 4), dtype=np.float32)
+PALETTE_VIEW = np.empty(0, dtype=np.int64)
+
+# object_name -> (fingerprint, byte_color, unique keys, counts, loop inverse)
+# so re-reports only rescan objects whose colors changed
+OBJECT_REPORT_CACHE = {}
+
+# True while sync_palette_page writes a clamped page back to scene.vcr_page
+_PAGE_SYNC = {"busy": False}
+
+# RGB KD-tree over PALETTE_COLORS, rebuilt whenever the report changes;
+# nearest_palette_index settles alpha among its RGB candidates
+PALETTE_KDTREE = None
 
 
 def linear_to_srgb(c):
@@ -36,21 +65,279 @@ def colors_equal(a, b, tol=1e-3):
     return all(abs(x - y) < tol for x, y in zip(a, b))
 
 
+def color_keys(colors, byte_color):
+    """Quantize an (N, 4) color array to one hashable integer key per row.
+
+    8-bit layers are keyed exactly by their bytes packed into a uint32;
+    float layers by their values rounded to 4 decimals.
+    """
+    if byte_color:
+        q = np.clip(np.rint(colors * 255.0), 0, 255).astype(np.uint32)
+        return (q[:, 0] << 24) | (q[:, 1] << 16) | (q[:, 2] << 8) | q[:, 3]
+    q = np.ascontiguousarray(np.rint(colors * 10000.0).astype(np.int64))
+    return q.view(np.dtype((np.void, q.itemsize * 4))).ravel()
+
+
+def key_colors(keys, byte_color):
+    """Inverse of color_keys: decode keys back to an (N, 4) float32 array."""
+    if byte_color:
+        q = np.stack([(keys >> shift) & 0xFF for shift in (24, 16, 8, 0)], axis=1)
+        return q.astype(np.float32) / 255.0
+    return np.ascontiguousarray(keys).view(np.int64).reshape(-1, 4).astype(np.float32) / 10000.0
+
+
+def unique_palette(key_arrays):
+    """Unique keys over several arrays, in order of first appearance.
+
+    Returns (keys, counts, inverses) where ``inverses`` holds, for every
+    input array, the int32 palette index of each of its elements.
+    """
+    keys = np.concatenate(key_arrays)
+    uniq, first, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    inverse = rank[inverse.ravel()]
+    splits = np.cumsum([len(k) for k in key_arrays])[:-1]
+    return uniq[order], counts[order], np.split(inverse, splits)
+
+
+# Float report keys are rounded to 4 decimals, so distinct palette entries
+# are at least this far apart and smaller merge tolerances change nothing
+MERGE_RESOLUTION = 1e-4
+
+
+def merge_palette(colors, counts, tol):
+    """Merge near-identical palette entries using a voxel hash.
+
+    Entries are bucketed into RGBA cells of size ``tol / 2``, so the
+    entries of one cell lie within ``tol`` of each other, and each cell is
+    represented by its count-weighted mean.  A cell then joins the
+    heaviest of its 80 neighbouring cells whose mean lies within
+    ``tol / 2`` of its own, provided that neighbour keeps its own cells.
+    Merges never chain, so every entry stays within ``1.5 * tol`` of the
+    mean of the leading cell it was merged into.  Returns (group of each entry, merged
+    colors, merged counts) with groups in first-appearance order.
+    """
+    weights = counts.astype(np.float64)
+    if tol < MERGE_RESOLUTION:
+        group = np.arange(len(colors), dtype=np.int32)
+        return group, colors.copy(), counts.astype(np.int64)
+    cell = tol / 2.0
+    q = np.floor(colors / cell).astype(np.int64)
+    low, high = q.min(), q.max()
+    if (int(high - low) + 3) ** 4 >= 2 ** 63:
+        # Far out-of-range float colors share the cells just outside [0, 1]
+        # so that four coordinates still pack into one int64 key
+        low, high = -1, int(np.ceil(1.0 / cell)) + 1
+    base = int(high - low) + 3
+    q = np.clip(q, low, high) - low + 1
+    keys = ((q[:, 0] * base + q[:, 1]) * base + q[:, 2]) * base + q[:, 3]
+    cells, cell_of = np.unique(keys, return_inverse=True)
+    cell_of = cell_of.ravel()
+    n = len(cells)
+    means = weighted_means(colors, cell_of, weights, n)
+    mass = np.bincount(cell_of, weights=weights, minlength=n)
+
+    # Heaviest close neighbour of every cell (itself when none is heavier)
+    leader = np.arange(n)
+    steps = np.array([-1, 0, 1])
+    for d in np.stack(np.meshgrid(steps, steps, steps, steps, indexing='ij'), -1).reshape(-1, 4):
+        offset = ((d[0] * base + d[1]) * base + d[2]) * base + d[3]
+        if offset == 0:
+            continue
+        pos = np.searchsorted(cells, cells + offset)
+        found = np.flatnonzero(pos < n)
+        found = found[cells[pos[found]] == cells[found] + offset]
+        other = pos[found]
+        close = np.linalg.norm(means[found] - means[other], axis=1) <= cell
+        found, other = found[close], other[close]
+        best = leader[found]
+        heavier = (mass[other] > mass[best]) | ((mass[other] == mass[best]) & (other < best))
+        leader[found[heavier]] = other[heavier]
+
+    # Only cells leading themselves take others in, so merges never chain
+    label = np.where(leader[leader] == leader, leader, np.arange(n))
+
+    _ids, _n, (group,) = unique_palette([label[cell_of]])
+    n_groups = int(group.max()) + 1 if len(group) else 0
+    merged = weighted_means(colors, group, weights, n_groups)
+    merged_counts = np.bincount(group, weights=weights, minlength=n_groups).astype(np.int64)
+    return group, merged, merged_counts
+
+
+def object_palette(obj_name, layer, byte_color):
+    """Unique keys, counts and loop inverse of one layer, reused while unchanged."""
+    colors = read_colors(layer)
+    fingerprint = hashlib.blake2b(colors.tobytes(), digest_size=16).digest()
+    cached = OBJECT_REPORT_CACHE.get(obj_name)
+    if cached and cached[0] == fingerprint and cached[1] == byte_color:
+        return cached[2:]
+    uniq, counts, (inverse,) = unique_palette([color_keys(colors, byte_color)])
+    OBJECT_REPORT_CACHE[obj_name] = (fingerprint, byte_color, uniq, counts, inverse)
+    return uniq, counts, inverse
+
+
+def saved_snapshot_path():
+    """File next to the current .blend holding persisted snapshots, or None."""
+    if not bpy.data.filepath:
+        return None
+    return os.path.splitext(bpy.data.filepath)[0] + "_vcol_saved.npz"
+
+
+def snapshot_key(mesh, count):
+    """Snapshots on disk are matched by mesh name and loop count."""
+    return f"{mesh.name}|{count}"
+
+
+def load_saved_snapshots():
+    """Fill SAVED_COLOR_MAP from the snapshot file for every matching mesh object."""
+    path = saved_snapshot_path()
+    if not path or not os.path.exists(path):
+        return 0
+    with np.load(path) as archive:
+        stored = set(archive.files)
+        for obj in bpy.data.objects:
+            if obj.type != 'MESH' or not obj.data.vertex_colors.active:
+                continue
+            key = snapshot_key(obj.data, len(obj.data.vertex_colors.active.data))
+            if key in stored:
+                SAVED_COLOR_MAP[obj.name] = archive[key]
+    return len(SAVED_COLOR_MAP)
+
+
+@persistent
+def clear_report_on_load(dummy):
+    """In-memory snapshots, undo history and the report palette belong to the
+    file they were taken in."""
+    global PALETTE_COLORS, PALETTE_COUNTS, PALETTE_EDITED, PALETTE_VIEW, PALETTE_KDTREE
+    SAVED_COLOR_MAP.clear()
+    OBJECT_REPORT_CACHE.clear()
+    UNDO_HISTORY.clear()
+    PALETTE_INVERSE.clear()
+    PALETTE_COLORS = np.empty((0, 4), dtype=np.float32)
+    PALETTE_COUNTS = np.empty(0, dtype=np.int64)
+    PALETTE_EDITED = np.empty((0, 4), dtype=np.float32)
+    PALETTE_VIEW = np.empty(0, dtype=np.int64)
+    PALETTE_KDTREE = None
+
+
+def edited_palette():
+    """Palette of the last report with the colors edited in the UI list applied."""
+    return PALETTE_EDITED.copy()
+
+
+def palette_page_count(scene):
+    return max(1, -(-len(PALETTE_VIEW) // scene.vcr_page_size))
+
+
+def sync_palette_page(scene):
+    """Mirror the current page of the palette view into scene.vcr_colors."""
+    page = min(scene.vcr_page, palette_page_count(scene) - 1)
+    if page != scene.vcr_page:
+        # Keep the UI on a page that exists once the palette shrinks
+        _PAGE_SYNC["busy"] = True
+        try:
+            scene.vcr_page = page
+        finally:
+            _PAGE_SYNC["busy"] = False
+    start = page * scene.vcr_page_size
+    shown = PALETTE_VIEW[start:start + scene.vcr_page_size]
+    items = scene.vcr_colors
+    items.clear()
+    for _ in range(len(shown)):
+        items.add()
+    if len(shown):
+        # foreach_set does not fire palette_item_update
+        items.foreach_set("index", shown.astype(np.int32))
+        items.foreach_set("color", PALETTE_EDITED[shown].ravel())
+
+
+def refresh_palette_view(scene):
+    """Rebuild the filtered and sorted view of the palette and show its first page."""
+    global PALETTE_VIEW
+    indices = np.arange(len(PALETTE_EDITED))
+    if scene.vcr_filter_enabled and len(indices):
+        reference = np.array(scene.vcr_pick_color, dtype=np.float32)
+        near = np.abs(PALETTE_EDITED - reference).max(axis=1) <= scene.vcr_filter_tolerance
+        indices = indices[near]
+    if scene.vcr_sort == 'FREQUENCY':
+        indices = indices[np.argsort(-PALETTE_COUNTS[indices], kind='stable')]
+    elif scene.vcr_sort == 'HUE':
+        h, sat, val = rgb_to_hsv(PALETTE_EDITED[indices, :3])
+        indices = indices[np.lexsort((val, sat, h))]
+    PALETTE_VIEW = indices
+    if scene.vcr_page != 0:
+        # palette_page_update mirrors the first page
+        scene.vcr_page = 0
+    else:
+        sync_palette_page(scene)
+
+
+def show_palette_index(scene, idx):
+    """Turn to the page holding palette entry ``idx`` and make it active."""
+    pos = np.flatnonzero(PALETTE_VIEW == idx)
+    if not len(pos):
+        return False
+    pos = int(pos[0])
+    page = pos // scene.vcr_page_size
+    if scene.vcr_page != page:
+        scene.vcr_page = page
+    scene.vcr_active_index = pos - page * scene.vcr_page_size
+    return True
+
+
+def palette_view_update(self, context):
+    refresh_palette_view(self)
+
+
+def palette_page_update(self, context):
+    if not _PAGE_SYNC["busy"]:
+        sync_palette_page(self)
+
+
+def palette_item_update(self, context):
+    """Write an edited list item back into the palette side store."""
+    if 0 <= self.index < len(PALETTE_EDITED):
+        PALETTE_EDITED[self.index] = self.color
+
+
+def build_palette_kdtree():
+    """Rebuild PALETTE_KDTREE from the current report palette."""
+    global PALETTE_KDTREE
+    tree = KDTree(len(PALETTE_COLORS))
+    for idx, color in enumerate(PALETTE_COLORS[:, :3].tolist()):
+        tree.insert(color, idx)
+    tree.balance()
+    PALETTE_KDTREE = tree
+
+
+def nearest_palette_index(color):
+    """Palette index closest to ``color`` (RGBA distance), or None without a report.
+
+    The KD-tree only holds RGB.  Its nearest entry bounds the RGBA distance,
+    so every entry within that bound in RGB is compared in RGBA.
+    """
+    if PALETTE_KDTREE is None or not len(PALETTE_COLORS):
+        return None
+    color = np.array(tuple(color)[:4], dtype=np.float32)
+    rgb = color[:3].tolist()
+    _co, idx, _dist = PALETTE_KDTREE.find(rgb)
+    bound = float(np.linalg.norm(PALETTE_COLORS[idx, :len(color)] - color)) + 1e-6
+    candidates = np.unique([idx] + [i for _co, i, _d in PALETTE_KDTREE.find_range(rgb, bound)])
+    dist = ((PALETTE_COLORS[candidates, :len(color)] - color) ** 2).sum(axis=1)
+    return int(candidates[np.argmin(dist)])
+
+
 def on_pick_color(self, context):
     """Update active index when user picks a color with the eyedropper."""
     if not hasattr(context, "scene") or not hasattr(context.scene, "vcr_pick_color"):
         return
 
-    picked = list(context.scene.vcr_pick_color)
-    best_idx = None
-    best_dist = float('inf')
-    for i, item in enumerate(context.scene.vcr_colors):
-        dist = sum((pc - ic) ** 2 for pc, ic in zip(picked, item.color))
-        if dist < best_dist:
-            best_dist = dist
-            best_idx = i
+    best_idx = nearest_palette_index(context.scene.vcr_pick_color)
     if best_idx is not None:
-        context.scene.vcr_active_index = best_idx
+        show_palette_index(context.scene, best_idx)
 
 
 class VCR_ColorItem(bpy.types.PropertyGroup):
@@ -60,7 +347,8 @@ class VCR_ColorItem(bpy.types.PropertyGroup):
         name="Color",
         description="Vertex color in sRGB",
         subtype='COLOR_GAMMA', size=4,
-        min=0.0, max=1.0
+        min=0.0, max=1.0,
+        update=palette_item_update
     )
 
 
@@ -81,16 +369,18 @@ class MESH_OT_report_vertex_colors(bpy.types.Operator):
     bl_label = "Report Vertex Colors"
 
     def execute(self, context):
+        global PALETTE_COLORS, PALETTE_COUNTS, PALETTE_EDITED
         if context.mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
         scene = context.scene
-        COLOR_LOOP_MAP.clear()
+        PALETTE_INVERSE.clear()
         scene.vcr_colors.clear()
+        # Deleted or renamed objects would otherwise stay cached all session
+        for name in [n for n in OBJECT_REPORT_CACHE if n not in bpy.data.objects]:
+            del OBJECT_REPORT_CACHE[name]
 
-        unique = []
-        seen = []
-
+        layers = []
         for obj in context.selected_objects:
             if obj.type != 'MESH':
                 continue
@@ -98,25 +388,40 @@ class MESH_OT_report_vertex_colors(bpy.types.Operator):
             if not layer:
                 self.report({'WARNING'}, f"{obj.name} has no vertex colors.")
                 continue
-            for poly in obj.data.polygons:
-                for li in poly.loop_indices:
-                    c = layer.data[li].color
-                    key = tuple(round(v, 4) for v in c)
-                    if key in seen:
-                        idx = seen.index(key)
-                        COLOR_LOOP_MAP[idx].append((obj.name, li))
-                    else:
-                        idx = len(unique)
-                        seen.append(key)
-                        unique.append(key)
-                        COLOR_LOOP_MAP[idx] = [(obj.name, li)]
-
-        for idx, key in enumerate(unique):
-            item = scene.vcr_colors.add()
-            item.index = idx
-            item.color = list(key)
-
-        self.report({'INFO'}, f"Found {len(unique)} unique colors.")
+            layers.append((obj.name, layer))
+
+        # Exact 8-bit keys unless a float layer is involved
+        byte_color = all(is_byte_layer(layer) for _, layer in layers)
+        per_object = [object_palette(name, layer, byte_color) for name, layer in layers]
+        if per_object:
+            # Merging the per-object palettes (each in first-appearance order)
+            # keeps the global first-appearance order of a full scan
+            uniq, _n, merged = unique_palette([p[0] for p in per_object])
+            counts = np.bincount(
+                np.concatenate(merged), weights=np.concatenate([p[1] for p in per_object]),
+                minlength=len(uniq)).astype(np.int64)
+            for (obj_name, _layer), (_u, _c, inverse), remap in zip(layers, per_object, merged):
+                PALETTE_INVERSE[obj_name] = remap[inverse]
+        else:
+            uniq, counts = np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+        PALETTE_COLORS = key_colors(uniq, byte_color)
+        PALETTE_COUNTS = counts
+
+        found = len(PALETTE_COLORS)
+        if scene.vcr_merge_tolerance > 0.0 and found:
+            group, PALETTE_COLORS, PALETTE_COUNTS = merge_palette(
+                PALETTE_COLORS, counts, scene.vcr_merge_tolerance)
+            for obj_name, inverse in PALETTE_INVERSE.items():
+                PALETTE_INVERSE[obj_name] = group[inverse]
+
+        PALETTE_EDITED = PALETTE_COLORS.copy()
+        build_palette_kdtree()
+        refresh_palette_view(scene)
+
+        if len(PALETTE_COLORS) != found:
+            self.report({'INFO'}, f"Found {found} unique colors, merged into {len(PALETTE_COLORS)}.")
+        else:
+            self.report({'INFO'}, f"Found {found} unique colors.")
         return {'FINISHED'}
 
 
@@ -131,16 +436,24 @@ class MESH_OT_save_vertex_colors(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='OBJECT')
 
         SAVED_COLOR_MAP.clear()
+        archive = {}
         for obj in context.selected_objects:
             if obj.type != 'MESH':
                 continue
             layer = obj.data.vertex_colors.active
             if not layer:
                 continue
-            for poly in obj.data.polygons:
-                for li in poly.loop_indices:
-                    color = list(layer.data[li].color)
-                    SAVED_COLOR_MAP.append((obj.name, li, color))
+            colors = read_compact_colors(layer)
+            SAVED_COLOR_MAP[obj.name] = colors
+            archive[snapshot_key(obj.data, len(colors))] = colors
+
+        if context.scene.vcr_persist_saved and archive:
+            path = saved_snapshot_path()
+            if path:
+                # Uncompressed on purpose: raw arrays save and load at disk speed
+                np.savez(path, **archive)
+            else:
+                self.report({'WARNING'}, "Save the .blend file to keep snapshots on disk.")
 
         self.report({'INFO'}, f"Saved colors for {len(context.selected_objects)} object(s).")
         return {'FINISHED'}
@@ -156,14 +469,26 @@ class MESH_OT_apply_saved_vertex_colors(bpy.types.Operator):
         if context.mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        for obj_name, li, color in SAVED_COLOR_MAP:
+        if not SAVED_COLOR_MAP and context.scene.vcr_persist_saved:
+            load_saved_snapshots()
+
+        for obj_name, saved in SAVED_COLOR_MAP.items():
             obj = bpy.data.objects.get(obj_name)
             if not obj or obj.type != 'MESH':
                 continue
             layer = obj.data.vertex_colors.active
             if not layer:
                 continue
-            layer.data[li].color = color
+            if len(saved) == len(layer.data):
+                write_compact_colors(layer, saved)
+            else:
+                # Topology changed: restore the loops both versions share
+                colors = read_compact_colors(layer)
+                if colors.dtype != saved.dtype:
+                    continue
+                count = min(len(colors), len(saved))
+                colors[:count] = saved[:count]
+                write_compact_colors(layer, colors)
 
         self.report({'INFO'}, "Re-applied saved vertex colors.")
         return {'FINISHED'}
@@ -179,29 +504,40 @@ class MESH_OT_apply_show_detail_changes(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='OBJECT')
 
         scene = context.scene
-        ORIGINAL_COLOR_MAP.clear()
-        changes_by_obj = {}
+        snapshot = {}
         selected_names = {obj.name for obj in context.selected_objects}
+        palette = edited_palette()
+        # Only loops whose palette entry was edited need to change
+        edited = (palette != PALETTE_COLORS).any(axis=1)
 
-        for item in scene.vcr_colors:
-            idx = item.index
-            new_color = list(item.color)
-            for obj_name, li in COLOR_LOOP_MAP.get(idx, []):
-                if scene.vcr_apply_selected and obj_name not in selected_names:
-                    continue
-                changes_by_obj.setdefault(obj_name, []).append((li, new_color))
-
-        for obj_name, changes in changes_by_obj.items():
+        for obj_name, inverse in PALETTE_INVERSE.items():
+            if scene.vcr_apply_selected and obj_name not in selected_names:
+                continue
             obj = bpy.data.objects.get(obj_name)
             if not obj or obj.type != 'MESH':
                 continue
             layer = obj.data.vertex_colors.active
             if not layer:
                 continue
-            for li, new_color in changes:
-                orig = list(layer.data[li].color)
-                ORIGINAL_COLOR_MAP.append((obj_name, li, orig))
-                layer.data[li].color = new_color
+            if len(layer.data) != len(inverse):
+                self.report({'WARNING'}, f"{obj_name} changed since the last report; skipped.")
+                continue
+            touched = np.flatnonzero(edited[inverse])
+            if not len(touched):
+                continue
+            colors = read_colors(layer)
+            if np.abs(colors - PALETTE_COLORS[inverse]).max() <= 1e-6:
+                # Pure palette remap: the old palette and the shared index rebuild it
+                snapshot[obj_name] = ('palette', PALETTE_COLORS, inverse)
+            else:
+                snapshot[obj_name] = ('loops', touched, colors[touched])
+            colors[touched] = palette[inverse[touched]]
+            write_colors(layer, colors)
+
+        if snapshot:
+            UNDO_HISTORY.append(snapshot)
+            while len(UNDO_HISTORY) > scene.vcr_undo_depth:
+                UNDO_HISTORY.popleft()
 
         self.report({'INFO'}, "Applied Show Details changes.")
         return {'FINISHED'}
@@ -217,21 +553,34 @@ class MESH_OT_undo_vertex_colors(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='OBJECT')
 
         scene = context.scene
+        if not UNDO_HISTORY:
+            self.report({'WARNING'}, "Nothing to undo.")
+            return {'CANCELLED'}
         selected_names = {obj.name for obj in context.selected_objects}
-        remaining = []
-
-        for obj_name, li, orig in ORIGINAL_COLOR_MAP:
-            if not scene.vcr_undo_selected or obj_name in selected_names:
-                obj = bpy.data.objects.get(obj_name)
-                if obj and obj.type == 'MESH':
-                    layer = obj.data.vertex_colors.active
-                    if layer:
-                        layer.data[li].color = orig
+        snapshot = UNDO_HISTORY[-1]
+
+        for obj_name in list(snapshot):
+            if scene.vcr_undo_selected and obj_name not in selected_names:
+                continue
+            kind, first, second = snapshot.pop(obj_name)
+            obj = bpy.data.objects.get(obj_name)
+            if not obj or obj.type != 'MESH':
+                continue
+            layer = obj.data.vertex_colors.active
+            if not layer:
+                continue
+            if kind == 'palette':
+                if len(layer.data) == len(second):
+                    write_colors(layer, first[second])
             else:
-                remaining.append((obj_name, li, orig))
+                colors = read_colors(layer)
+                valid = first < len(colors)
+                colors[first[valid]] = second[valid]
+                write_colors(layer, colors)
 
-        ORIGINAL_COLOR_MAP.clear()
-        ORIGINAL_COLOR_MAP.extend(remaining)
+        # Objects left out by "Undo Selected" stay on the history
+        if not snapshot:
+            UNDO_HISTORY.pop()
 
         self.report({'INFO'}, "Reverted vertex color changes.")
         return {'FINISHED'}
@@ -248,17 +597,26 @@ class MESH_OT_convert_vertex_colors(bpy.types.Operator):
 
         scene = context.scene
         target = scene.vcr_target_count
-        if not scene.vcr_colors:
+        if not len(PALETTE_COLORS):
             self.report({'ERROR'}, "Run 'Report Vertex Colors' first.")
             return {'CANCELLED'}
 
-        unique_colors = [tuple(item.color) for item in scene.vcr_colors]
-        data = np.array(unique_colors, dtype=float)
+        data = edited_palette()
         if len(data) < target:
             self.report({'WARNING'}, "Fewer unique colors than target clusters.")
             return {'CANCELLED'}
 
-        centers = kmeans_numpy(data, target, iterations=10, seed=0)
+        # Every unique color pulls its center with the number of loops using it
+        engine = scene.vcr_quantizer
+        if engine == 'KMEANS':
+            centers = kmeans_numpy(data, target, iterations=10, seed=0, weights=PALETTE_COUNTS)
+            palette_labels, _dists = nearest_centers(data, centers)
+        else:
+            quantize = median_cut if engine == 'MEDIAN_CUT' else octree_quantize
+            centers, palette_labels = quantize(data, target, PALETTE_COUNTS)
+            if scene.vcr_refine_kmeans:
+                centers = kmeans_numpy(data, target, iterations=10, weights=PALETTE_COUNTS, init=centers)
+                palette_labels, _dists = nearest_centers(data, centers)
 
         for obj in context.selected_objects:
             if obj.type != 'MESH':
@@ -266,12 +624,13 @@ class MESH_OT_convert_vertex_colors(bpy.types.Operator):
             layer = obj.data.vertex_colors.active
             if not layer:
                 continue
-            for poly in obj.data.polygons:
-                for li in poly.loop_indices:
-                    orig = np.array(layer.data[li].color, dtype=float)
-                    dists = np.sum((centers - orig) ** 2, axis=1)
-                    idx = int(np.argmin(dists))
-                    layer.data[li].color = centers[idx].tolist()
+            inverse = PALETTE_INVERSE.get(obj.name)
+            if inverse is not None and len(inverse) == len(layer.data):
+                labels = palette_labels[inverse]
+            else:
+                # Not part of the last report: match its loops directly
+                labels, _dists = nearest_centers(read_colors(layer), centers)
+            write_colors(layer, centers[labels])
 
         bpy.ops.mesh.report_vertex_colors()
         self.report({'INFO'}, f"Converted to {target} colors.")
@@ -293,7 +652,6 @@ class MESH_OT_pick_vertex_color(bpy.types.Operator):
         scene = context.scene
         obj = context.active_object
         bm = bmesh.from_edit_mesh(obj.data)
-        bm.faces.ensure_lookup_table()
 
         verts = [v for v in bm.verts if v.select]
         if len(verts) != 1:
@@ -306,61 +664,194 @@ class MESH_OT_pick_vertex_color(bpy.types.Operator):
             self.report({'ERROR'}, "No active vertex color layer found.")
             return {'CANCELLED'}
 
-        picked = None
-        for face in bm.faces:
-            for loop in face.loops:
-                if loop.vert == vert:
-                    picked = loop[color_layer]
-                    break
-            if picked:
-                break
-
-        if not picked:
+        if not vert.link_loops:
             self.report({'ERROR'}, "Could not retrieve vertex color.")
             return {'CANCELLED'}
+        picked = vert.link_loops[0][color_layer]
 
         key = tuple(round(c, 4) for c in picked)
-        for i, item in enumerate(scene.vcr_colors):
-            if colors_equal(key, tuple(item.color)):
-                scene.vcr_active_index = i
-                self.report({'INFO'}, f"Color matched at index {i+1}.")
-                return {'FINISHED'}
+        i = nearest_palette_index(key)
+        tol = max(1e-3, scene.vcr_merge_tolerance)
+        if i is not None and colors_equal(key, PALETTE_COLORS[i].tolist(), tol):
+            if not show_palette_index(scene, i):
+                self.report({'WARNING'}, f"Color {i+1} is hidden by the list filter.")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Color matched at index {i+1}.")
+            return {'FINISHED'}
 
         self.report({'WARNING'}, "Vertex color not found in list.")
         return {'CANCELLED'}
 
 
-def init_kmeans_pp(data, k, seed=None):
-    """Initialize k-means++ centers for clustering."""
-    if seed is not None:
-        np.random.seed(seed)
-    centers = []
-    idx = np.random.randint(len(data))
-    centers.append(data[idx])
+def nearest_centers(data, centers, chunk=65536):
+    """Label and squared distance of the closest center for every row of ``data``.
+
+    Distances are computed in float32 blocks of ``chunk`` rows so memory
+    stays bounded at chunk x k regardless of the input size.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    centers = np.asarray(centers, dtype=np.float32)
+    labels = np.empty(len(data), dtype=np.int32)
+    dists = np.empty(len(data), dtype=np.float32)
+    c_norm = np.einsum('ij,ij->i', centers, centers)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        d = np.einsum('ij,ij->i', block, block)[:, None] - 2.0 * (block @ centers.T) + c_norm
+        labels[start:start + chunk] = np.argmin(d, axis=1)
+        dists[start:start + chunk] = np.maximum(d[np.arange(len(block)), labels[start:start + chunk]], 0.0)
+    return labels, dists
+
+
+def init_kmeans_pp(data, k, seed=None, weights=None):
+    """Initialize k-means++ centers for clustering, sampling by weight x distance."""
+    rng = np.random.default_rng(seed)
+    weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=np.float64)
+    centers = [data[rng.choice(len(data), p=weights / weights.sum())]]
+    best = np.sum((data - centers[0]) ** 2, axis=1)
     for _ in range(1, k):
-        dists = np.min(
-            np.stack([np.sum((data - c)**2, axis=1) for c in centers]), axis=0
-        )
-        probs = dists / dists.sum()
-        idx = np.random.choice(len(data), p=probs)
+        probs = weights * best
+        total = probs.sum()
+        idx = rng.choice(len(data), p=probs / total) if total > 0 else rng.integers(len(data))
         centers.append(data[idx])
+        best = np.minimum(best, np.sum((data - data[idx]) ** 2, axis=1))
     return np.vstack(centers)
 
 
-def kmeans_numpy(data, k, iterations=10, seed=None):
-    """Run k-means clustering on an Nx4 RGBA dataset."""
-    centers = init_kmeans_pp(data, k, seed)
+def kmeans_numpy(data, k, iterations=10, seed=None, weights=None, tol=1e-6, init=None):
+    """Run weighted k-means clustering on an Nx4 RGBA dataset.
+
+    ``weights`` (e.g. loop counts per unique color) scale each row's pull
+    on its center; iteration stops early once no center moves more than
+    ``tol``.  ``init`` seeds the centers instead of k-means++.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if init is None:
+        centers = init_kmeans_pp(data, k, seed, weights).astype(np.float32)
+    else:
+        centers = np.array(init, dtype=np.float32)
+        k = len(centers)
     for _ in range(iterations):
-        dists = np.sum((data[:, None, :] - centers[None, :, :])**2, axis=2)
-        labels = np.argmin(dists, axis=1)
-        new_centers = []
-        for i in range(k):
-            pts = data[labels == i]
-            new_centers.append(pts.mean(axis=0) if len(pts) else centers[i])
-        centers = np.vstack(new_centers)
+        labels, _dists = nearest_centers(data, centers)
+        mass = np.bincount(labels, weights=weights, minlength=k)
+        new_centers = centers.copy()
+        filled = mass > 0
+        for ch in range(data.shape[1]):
+            sums = np.bincount(labels, weights=weights * data[:, ch], minlength=k)
+            new_centers[filled, ch] = sums[filled] / mass[filled]
+        shift = np.max(np.abs(new_centers - centers))
+        centers = new_centers
+        if shift <= tol:
+            break
+    return centers
+
+
+def weighted_means(data, labels, weights, count):
+    """Weighted mean of the rows of ``data`` in each of ``count`` groups."""
+    mass = np.bincount(labels, weights=weights, minlength=count)
+    centers = np.empty((count, data.shape[1]), dtype=np.float32)
+    for ch in range(data.shape[1]):
+        centers[:, ch] = np.bincount(labels, weights=weights * data[:, ch], minlength=count) / np.maximum(mass, 1e-12)
     return centers
 
 
+def median_cut(data, k, weights=None):
+    """Median-cut quantizer: returns (centers, labels) for at most ``k`` boxes.
+
+    The box with the widest weighted channel range is split at the
+    weighted median of that channel until ``k`` boxes exist or none can
+    be split further.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=np.float64)
+    def score(box):
+        if len(box) < 2:
+            return 0.0, 0
+        spans = data[box].max(axis=0) - data[box].min(axis=0)
+        return float(spans.max() * weights[box].sum()), int(np.argmax(spans))
+
+    boxes = [np.arange(len(data))]
+    scores = [score(boxes[0])]
+    while len(boxes) < k:
+        target = max(range(len(boxes)), key=lambda i: scores[i][0])
+        if scores[target][0] <= 0:
+            break
+        box = boxes.pop(target)
+        channel = scores.pop(target)[1]
+        order = box[np.argsort(data[box, channel], kind='stable')]
+        cum = np.cumsum(weights[order])
+        cut = int(np.searchsorted(cum, cum[-1] / 2.0)) + 1
+        cut = min(max(cut, 1), len(order) - 1)
+        for half in (order[:cut], order[cut:]):
+            boxes.append(half)
+            scores.append(score(half))
+
+    labels = np.empty(len(data), dtype=np.int32)
+    for i, box in enumerate(boxes):
+        labels[box] = i
+    return weighted_means(data, labels, weights, len(boxes)), labels
+
+
+# Deepest octree level tried: 2**-14 is finer than the 4-decimal report
+# keys and four 14-bit cell coordinates still pack into one int64
+OCTREE_DEPTH = 14
+
+
+def octree_quantize(data, k, weights=None):
+    """Octree quantizer over the RGBA cube: returns (centers, labels).
+
+    Colors are bucketed at the shallowest tree level holding more than
+    ``k`` cells.  The children of the lightest parent node one level up
+    are then merged, one node at a time as in classic octree reduction,
+    until exactly ``k`` leaves remain; a node whose full merge would drop
+    below ``k`` only merges its lightest children.  Fewer than ``k``
+    distinct colors give one leaf per color.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def cells(level):
+        size = 1 << level
+        q = np.clip(np.floor(data * size).astype(np.int64), 0, size - 1)
+        ids = ((q[:, 0] * size + q[:, 1]) * size + q[:, 2]) * size + q[:, 3]
+        return np.unique(ids, return_inverse=True)[1].ravel()
+
+    parent = cells(0)
+    for level in range(1, OCTREE_DEPTH + 1):
+        child = cells(level)
+        if child.max() + 1 > k:
+            break
+        parent = child
+    else:
+        return weighted_means(data, child, weights, child.max() + 1), child.astype(np.int32)
+
+    n_children = child.max() + 1
+    # Parent and weight of each child cell; the parent level has at most k cells
+    child_parent = np.empty(n_children, dtype=np.int64)
+    child_parent[child] = parent
+    child_mass = np.bincount(child, weights=weights, minlength=n_children)
+    n_parents = parent.max() + 1
+    parent_mass = np.bincount(child_parent, weights=child_mass, minlength=n_parents)
+    fan_out = np.bincount(child_parent, minlength=n_parents)
+    # Children grouped by parent, lightest first
+    by_parent = np.lexsort((child_mass, child_parent))
+    starts = np.cumsum(fan_out) - fan_out
+
+    leaf_of = np.arange(n_children)
+    leaves = n_children
+    for p in np.argsort(parent_mass, kind='stable'):
+        if leaves <= k:
+            break
+        if fan_out[p] < 2:
+            continue
+        kids = by_parent[starts[p]:starts[p] + min(fan_out[p], leaves - k + 1)]
+        leaf_of[kids] = kids[0]
+        leaves -= len(kids) - 1
+
+    labels = np.unique(leaf_of[child], return_inverse=True)[1].ravel().astype(np.int32)
+    return weighted_means(data, labels, weights, labels.max() + 1), labels
+
+
 class MESH_PT_vertex_color_reporter_panel(bpy.types.Panel):
     """UI Panel for reporting and editing vertex colors."""
     bl_label = "Vertex Color Reporter"
@@ -374,22 +865,37 @@ class MESH_PT_vertex_color_reporter_panel(bpy.types.Panel):
         scene = context.scene
 
         layout.operator("mesh.report_vertex_colors", icon='VIEWZOOM')
+        layout.prop(scene, "vcr_merge_tolerance", text="Merge Tolerance")
         layout.prop(scene, "vcr_show_details", text="Show Details", toggle=True)
 
-        if scene.vcr_show_details and scene.vcr_colors:
+        if scene.vcr_show_details and len(PALETTE_COLORS):
             layout.prop(scene, "vcr_pick_color", text="Pick Color", icon='EYEDROPPER')
             layout.operator("mesh.pick_vertex_color", icon='VERTEXSEL')
+
+            # -- Sort / filter of the palette view --
+            layout.prop(scene, "vcr_sort", text="Sort")
+            row = layout.row(align=True)
+            row.prop(scene, "vcr_filter_enabled", text="Near Pick Color")
+            sub = row.row(align=True)
+            sub.enabled = scene.vcr_filter_enabled
+            sub.prop(scene, "vcr_filter_tolerance", text="Tolerance")
+
             layout.template_list(
                 "VCR_UL_color_list", "vcr_colors",
                 scene, "vcr_colors",
                 scene, "vcr_active_index",
                 rows=4
             )
+            row = layout.row(align=True)
+            row.prop(scene, "vcr_page", text="Page")
+            row.label(text=f"/ {palette_page_count(scene)}  ({len(PALETTE_VIEW)} colors)")
+            row.prop(scene, "vcr_page_size", text="Per Page")
 
             # -- Apply/Undo selection checkboxes side by side --
             row = layout.row(align=True)
             row.prop(scene, "vcr_apply_selected", text="Apply Selected")
             row.prop(scene, "vcr_undo_selected", text="Undo Selected")
+            layout.prop(scene, "vcr_undo_depth", text="Undo Levels")
             layout.separator()
 
             # -- Apply/Undo buttons grouped --
@@ -403,10 +909,14 @@ class MESH_PT_vertex_color_reporter_panel(bpy.types.Panel):
             row = layout.row(align=True)
             row.operator("mesh.save_vertex_colors", text="Save Data", icon='EXPORT')
             row.operator("mesh.apply_saved_vertex_colors", text="Apply Saved", icon='IMPORT')
+            layout.prop(scene, "vcr_persist_saved", text="Keep Saved Data on Disk")
 
         layout.separator()
         layout.label(text="Smart Convert Palette:")
+        layout.prop(scene, "vcr_quantizer", text="Engine")
         layout.prop(scene, "vcr_target_count", text="Clusters")
+        if scene.vcr_quantizer != 'KMEANS':
+            layout.prop(scene, "vcr_refine_kmeans", text="Refine with K-Means")
         layout.operator("mesh.convert_vertex_colors", icon='COLOR')
 
 
@@ -439,8 +949,57 @@ def register():
     )
     bpy.types.Scene.vcr_colors = bpy.props.CollectionProperty(type=VCR_ColorItem)
     bpy.types.Scene.vcr_active_index = bpy.props.IntProperty(default=0)
+    bpy.types.Scene.vcr_page = bpy.props.IntProperty(
+        name="Page", description="Page of the palette shown in the list",
+        default=0, min=0, update=palette_page_update
+    )
+    bpy.types.Scene.vcr_page_size = bpy.props.IntProperty(
+        name="Per Page", description="Palette entries shown per page",
+        default=200, min=10, max=5000, update=palette_page_update
+    )
+    bpy.types.Scene.vcr_sort = bpy.props.EnumProperty(
+        name="Sort",
+        description="Order of the palette list",
+        items=[
+            ('ORDER', "Found", "Order in which colors were found"),
+            ('FREQUENCY', "Frequency", "Most used colors first"),
+            ('HUE', "Hue", "By hue, then saturation and value"),
+        ],
+        default='ORDER', update=palette_view_update
+    )
+    bpy.types.Scene.vcr_filter_enabled = bpy.props.BoolProperty(
+        name="Near Pick Color",
+        description="Only list colors close to the pick color",
+        default=False, update=palette_view_update
+    )
+    bpy.types.Scene.vcr_filter_tolerance = bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Maximum per-channel difference from the pick color",
+        default=0.05, min=0.0, max=1.0, update=palette_view_update
+    )
+    bpy.types.Scene.vcr_merge_tolerance = bpy.props.FloatProperty(
+        name="Merge Tolerance",
+        description="Report colors within about this RGBA distance of each other as one palette entry "
+                    "(below 0.0001 keeps every distinct color)",
+        default=0.0, min=0.0, max=0.5, precision=3
+    )
     bpy.types.Scene.vcr_show_details = bpy.props.BoolProperty(name="Show Details", default=False)
     bpy.types.Scene.vcr_target_count = bpy.props.IntProperty(name="Target Clusters", default=4, min=1)
+    bpy.types.Scene.vcr_quantizer = bpy.props.EnumProperty(
+        name="Quantizer",
+        description="Algorithm used to reduce the palette",
+        items=[
+            ('KMEANS', "K-Means", "Weighted k-means; slowest, best quality"),
+            ('MEDIAN_CUT', "Median Cut", "Split the color box at weighted medians; single pass"),
+            ('OCTREE', "Octree", "Collapse the lightest octree nodes; single pass"),
+        ],
+        default='KMEANS'
+    )
+    bpy.types.Scene.vcr_refine_kmeans = bpy.props.BoolProperty(
+        name="Refine with K-Means",
+        description="Use the quantizer result as the starting centers of a k-means pass",
+        default=False
+    )
     bpy.types.Scene.vcr_apply_selected = bpy.props.BoolProperty(
         name="Apply Selected",
         description="If checked, only apply changes to selected objects",
@@ -451,19 +1010,42 @@ def register():
         description="If checked, only undo changes on selected objects",
         default=False
     )
+    bpy.types.Scene.vcr_undo_depth = bpy.props.IntProperty(
+        name="Undo Levels",
+        description="Number of palette applications that can be undone",
+        default=8, min=1, max=64
+    )
+    bpy.types.Scene.vcr_persist_saved = bpy.props.BoolProperty(
+        name="Keep Saved Data on Disk",
+        description="Also write saved colors to a .npz file next to the .blend, matched by mesh name and loop count",
+        default=False
+    )
+    bpy.app.handlers.load_post.append(clear_report_on_load)
 
 
 def unregister():
+    if clear_report_on_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_report_on_load)
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
 
     del bpy.types.Scene.vcr_pick_color
     del bpy.types.Scene.vcr_colors
     del bpy.types.Scene.vcr_active_index
+    del bpy.types.Scene.vcr_page
+    del bpy.types.Scene.vcr_page_size
+    del bpy.types.Scene.vcr_sort
+    del bpy.types.Scene.vcr_filter_enabled
+    del bpy.types.Scene.vcr_filter_tolerance
+    del bpy.types.Scene.vcr_merge_tolerance
     del bpy.types.Scene.vcr_show_details
     del bpy.types.Scene.vcr_target_count
+    del bpy.types.Scene.vcr_quantizer
+    del bpy.types.Scene.vcr_refine_kmeans
     del bpy.types.Scene.vcr_apply_selected
     del bpy.types.Scene.vcr_undo_selected
+    del bpy.types.Scene.vcr_undo_depth
+    del bpy.types.Scene.vcr_persist_saved
 
 
 if __name__ == "__main__":